@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Offline export of a recording (JSON and/or binary '~' lines, e.g. from
+# '--logfile' or '--capture') without the GUI and without FuncAnimation:
+#  - long waterfall strips as PNG, STRIP_ROWS scans per image
+#  - per-scan spectrum + waterfall frames as PNG files or as raw rgb24 video
+#    (file *.rgb, or piped into ffmpeg for any other extension); a change of
+#    the frequency range starts a new segment (video NAME_01.mp4, ...,
+#    images seg01_frame_*.png, ...)
+# Colors come from the same NumPy lookup tables as the live waterfall
+# (lib/waterfall.py). The input is streamed in chunks, so memory stays
+# bounded; chunks can be rendered in parallel processes ('--jobs').
+# matplotlib is only used for '--axes' (strips with frequency/time axes).
+#
+# python ExportRecording.py scan_json.log --strip out/wf
+# python ExportRecording.py scan_json.log --video session.mp4 --fps 20 --jobs 4
+# python ExportRecording.py scan_json.log --frames-dir out/frames --every 10
+
+import argparse
+import json
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import lib.binframe as bfr
+import lib.waterfall as wfl
+
+# y-axis values in dBm (as FrequencyMonitor.py)
+DBM_MAX = -20
+DBM_MIN = -110
+DBM_MAX_WF = -40
+DBM_MIN_WF = -90
+WF_CMAP = "viridis"
+
+STRIP_ROWS   = 2000         # scans per waterfall strip image
+VIDEO_CHUNK  = 64           # scans per video/frames chunk (one job)
+SPEC_HEIGHT  = 200          # px, spectrum part of a frame
+WF_HEIGHT    = 200          # px = scans of waterfall history in a frame
+PX_PER_MHZ   = 4
+
+COLOR_BG   = (255, 255, 255)
+COLOR_MAX  = (31, 119, 180)
+COLOR_GRID = (220, 220, 220)
+
+COLUMN_INDEX = {"avg": 0, "min": 1, "max": 2, "hold": 3}
+
+
+# -------------------------------------------------------------
+# Eingabe (gestreamt)
+# -------------------------------------------------------------
+def read_scans(path, column="max"):
+    """Yields (freqs, values) per scan line, JSON or binary, other lines are skipped."""
+    col = COLUMN_INDEX[column]
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                if bfr.is_binary_line(line):
+                    _, _, freqs, cols = bfr.decode_line(line)
+                    yield freqs, cols[col]
+                elif "freq" in line:
+                    c = np.asarray(json.loads(line)["c"], dtype=np.int16)
+                    yield c[:, 0], c[:, col + 1]
+            except (bfr.FrameError, ValueError, KeyError, TypeError, IndexError):
+                continue
+
+def read_chunks(scans, size):
+    """Groups consecutive scans with the same frequency range: (freqs, rows (k x n))."""
+    freqs = None
+    rows = []
+    for f, v in scans:
+        if freqs is not None and (f.size != freqs.size or f[0] != freqs[0] or len(rows) >= size):
+            yield freqs, np.array(rows)
+            rows = []
+        if not rows:
+            freqs = f
+        rows.append(v)
+    if rows:
+        yield freqs, np.array(rows)
+
+
+# -------------------------------------------------------------
+# Raw-Writer
+# -------------------------------------------------------------
+def encode_png(rgb: np.ndarray, level=6) -> bytes:
+    """Minimal PNG encoder (rgb24, filter 0) without image libraries."""
+    h, w, _ = rgb.shape
+    raw = np.zeros((h, 1 + 3 * w), dtype=np.uint8)
+    raw[:, 1:] = rgb.reshape(h, 3 * w)
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw.tobytes(), level))
+            + chunk(b"IEND", b""))
+
+def write_png(path, rgb):
+    with open(path, "wb") as f:
+        f.write(encode_png(rgb))
+
+def open_video(path, width, height, fps):
+    """Raw rgb24 file (*.rgb/*.raw) or ffmpeg process for other formats; returns (stream, proc)."""
+    if path.endswith((".rgb", ".raw")):
+        return open(path, "wb"), None
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg not found, use a *.rgb output file for raw video")
+    proc = subprocess.Popen([ffmpeg, "-loglevel", "error", "-y",
+                             "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps),
+                             "-i", "-", "-pix_fmt", "yuv420p", path], stdin=subprocess.PIPE)
+    return proc.stdin, proc
+
+
+# -------------------------------------------------------------
+# Rendern (in Worker-Prozessen)
+# -------------------------------------------------------------
+def colorize(rows, lut, vmin=DBM_MIN_WF, vmax=DBM_MAX_WF) -> np.ndarray:
+    """dBm rows (k x n) -> rgb (k x n x 3) via lookup table."""
+    return lut[wfl.lut_index(rows, vmin, vmax)][..., :3]
+
+def render_strip(path, freqs, rows, lut, axes=False):
+    """One waterfall strip, oldest scan at the top."""
+    rgb = colorize(rows, lut)
+    if not axes:
+        write_png(path, rgb)
+        return path
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(10, max(3, min(60, rows.shape[0] / 100))))
+    ax.imshow(rgb, aspect="auto", interpolation="nearest",
+              extent=[freqs[0], freqs[-1], rows.shape[0], 0])
+    ax.set_xlabel("Frequency [MHz]", fontsize=10)
+    ax.set_ylabel("Scan (older → up)", fontsize=10)
+    fig.savefig(path, dpi=100, bbox_inches="tight")
+    plt.close(fig)
+    return path
+
+def render_frames(prev, rows, lut):
+    """
+    Spectrum + waterfall frames for rows (k x n); prev are the scans before
+    (waterfall history, up to WF_HEIGHT). Returns uint8 array (k x H x W x 3).
+    """
+    k, n = rows.shape
+    width = n * PX_PER_MHZ
+    frames = np.empty((k, SPEC_HEIGHT + WF_HEIGHT, width, 3), dtype=np.uint8)
+
+    # Spektrum: Balken bis zum Pegel, alle Frames auf einmal
+    frac = (DBM_MAX - rows.astype(np.float32)) / (DBM_MAX - DBM_MIN)
+    top = np.clip(frac * SPEC_HEIGHT, 0, SPEC_HEIGHT).astype(np.int32)            # k x n
+    yy = np.arange(SPEC_HEIGHT, dtype=np.int32)[None, :, None]
+    bar = np.repeat(yy >= top[:, None, :], PX_PER_MHZ, axis=2)                    # k x H x W
+    spec = frames[:, :SPEC_HEIGHT]
+    spec[:] = COLOR_BG
+    spec[:, ::SPEC_HEIGHT // 9] = COLOR_GRID                                      # ~10 dB Raster
+    spec[bar] = COLOR_MAX
+
+    # Wasserfall: neueste Zeile oben, Historie aus prev + rows
+    hist = np.concatenate((np.full((WF_HEIGHT, n), DBM_MIN_WF, dtype=rows.dtype), prev, rows))[-(WF_HEIGHT + k):]
+    rgb = np.repeat(colorize(hist, lut), PX_PER_MHZ, axis=1)                     # (WF_HEIGHT + k) x W x 3
+    for i in range(k):
+        frames[i, SPEC_HEIGHT:] = rgb[i + 1:i + 1 + WF_HEIGHT][::-1]
+    return frames
+
+def render_frames_png(directory, prefix, start, every, prev, rows, lut):
+    frames = render_frames(prev, rows, lut)
+    paths = []
+    for i in range(frames.shape[0]):
+        if (start + i) % every:
+            continue
+        path = os.path.join(directory, f"{prefix}frame_{start + i:06d}.png")
+        write_png(path, frames[i])
+        paths.append(path)
+    return paths
+
+def render_frames_raw(prev, rows, lut):
+    return render_frames(prev, rows, lut).tobytes()
+
+
+# -------------------------------------------------------------
+# Export
+# -------------------------------------------------------------
+class Runner:
+    """Executes render jobs inline or in a process pool, max. 2*jobs pending (bounded memory)."""
+
+    def __init__(self, jobs):
+        self.pool = ProcessPoolExecutor(jobs) if jobs > 1 else None
+        self.pending = deque()
+        self.limit = 2 * max(1, jobs)
+
+    def submit(self, fn, *args):
+        """Returns results of finished jobs in submit order."""
+        if self.pool is None:
+            return [fn(*args)]
+        self.pending.append(self.pool.submit(fn, *args))
+        done = []
+        while len(self.pending) >= self.limit or (self.pending and self.pending[0].done()):
+            done.append(self.pending.popleft().result())
+        return done
+
+    def drain(self):
+        """Waits for all pending jobs, results in submit order."""
+        done = [f.result() for f in self.pending]
+        self.pending.clear()
+        return done
+
+    def finish(self):
+        done = self.drain()
+        if self.pool is not None:
+            self.pool.shutdown()
+        return done
+
+
+def export_strips(args, lut):
+    os.makedirs(os.path.dirname(args.strip) or ".", exist_ok=True)
+    runner = Runner(args.jobs)
+    n = 0
+    for i, (freqs, rows) in enumerate(read_chunks(read_scans(args.infile, args.column), args.strip_rows)):
+        path = f"{args.strip}_{i:04d}.png"
+        for p in runner.submit(render_strip, path, freqs, rows, lut, args.axes):
+            print(p)
+        n += rows.shape[0]
+    for p in runner.finish():
+        print(p)
+    return n
+
+def segment_name(path, seg):
+    """Output name of segment seg: 'out.mp4', 'out_01.mp4', 'out_02.mp4', ..."""
+    if seg == 0:
+        return path
+    base, ext = os.path.splitext(path)
+    return f"{base}_{seg:02d}{ext}"
+
+def export_frames(args, lut):
+    """Video and/or frame images; every frequency range change starts a new segment."""
+    runner = Runner(args.jobs)
+    stream = proc = None
+    freqs0 = None
+    prev = None
+    n = 0
+    seg = -1
+    if args.frames_dir:
+        os.makedirs(args.frames_dir, exist_ok=True)
+
+    def emit(results):
+        for r in results:
+            if stream is not None and isinstance(r, bytes):
+                stream.write(r)
+
+    def close_video():
+        if stream is not None:
+            stream.close()
+        if proc is not None:
+            proc.wait()
+
+    try:
+        for freqs, rows in read_chunks(read_scans(args.infile, args.column), VIDEO_CHUNK):
+            if freqs0 is None or freqs.size != freqs0.size or freqs[0] != freqs0[0]:
+                # neues Segment: ausstehende Frames noch in das alte Video schreiben
+                emit(runner.drain())
+                close_video()
+                stream = proc = None
+                seg += 1
+                freqs0 = freqs
+                prev = np.zeros((0, freqs.size), dtype=rows.dtype)
+                if args.video:
+                    path = segment_name(args.video, seg)
+                    stream, proc = open_video(path, freqs.size * PX_PER_MHZ, SPEC_HEIGHT + WF_HEIGHT, args.fps)
+                    if seg:
+                        print(f"{path}: {int(freqs[0])}...{int(freqs[-1])} MHz from scan {n}", file=sys.stderr)
+            if args.video:
+                emit(runner.submit(render_frames_raw, prev, rows, lut))
+            if args.frames_dir:
+                prefix = f"seg{seg:02d}_" if seg else ""
+                emit(runner.submit(render_frames_png, args.frames_dir, prefix, n, args.every, prev, rows, lut))
+            prev = np.concatenate((prev, rows))[-WF_HEIGHT:]
+            n += rows.shape[0]
+        emit(runner.finish())
+    finally:
+        close_video()
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="export a scan recording (JSON/binary lines) as waterfall strips, frames or video")
+    parser.add_argument("infile", help="recording, e.g. from '--logfile' or '--capture'")
+    parser.add_argument("--strip", metavar="PREFIX", help="waterfall strips PREFIX_0000.png, ...")
+    parser.add_argument("--strip-rows", type=int, default=STRIP_ROWS, help="scans per strip (default %(default)s)")
+    parser.add_argument("--axes", action="store_true", help="strips with frequency/time axes (uses matplotlib)")
+    parser.add_argument("--video", metavar="FILE", help="video of spectrum + waterfall, *.rgb = raw rgb24, else via ffmpeg")
+    parser.add_argument("--fps", type=int, default=20)
+    parser.add_argument("--frames-dir", metavar="DIR", help="spectrum + waterfall frame images DIR/frame_000000.png, ...")
+    parser.add_argument("--every", type=int, default=1, help="frames-dir: only every n-th scan")
+    parser.add_argument("--column", default="max", choices=list(COLUMN_INDEX), help="scan column to render (default %(default)s)")
+    parser.add_argument("--cmap", default=WF_CMAP)
+    parser.add_argument("--jobs", type=int, default=1, help="render chunks in n parallel processes")
+    args = parser.parse_args()
+    if not (args.strip or args.video or args.frames_dir):
+        parser.error("nothing to do, use --strip, --video and/or --frames-dir")
+
+    lut = wfl.make_lut(args.cmap)
+    t0 = time.perf_counter()
+    if args.strip:
+        n = export_strips(args, lut)
+        print(f"strips: {n} scans in {time.perf_counter() - t0:.2f} s")
+    if args.video or args.frames_dir:
+        t1 = time.perf_counter()
+        n = export_frames(args, lut)
+        print(f"frames: {n} scans in {time.perf_counter() - t1:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
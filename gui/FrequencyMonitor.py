@@ -10,15 +10,22 @@ import datetime
 import sys
 import re               # for input mode
 
-import numpy as np
-import serial
-import serial.tools.list_ports
+T_START = time.perf_counter()           # for "first frame after ... ms"
 
-import matplotlib as mpl
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
+import numpy as np
 
-import lib.audio as ali
+# serial, matplotlib and lib.audio are imported on demand (fast startup):
+#   serial     -> open_serial()/auto_detect_port(), only in serial mode
+#   matplotlib -> build_gui()/main(), not in headless mode
+#   lib.audio  -> load_audio(), first time 'a' is pressed
+import lib.binframe as bfr
+import lib.capture as cap
+import lib.detectors as dtc
+import lib.peaks as pks
+import lib.protocols as prt
+import lib.scanframe as sfr
+import lib.scheduler as sch
+import lib.waterfall as wfl
 
 
 # -------------------------------------------------------------
@@ -49,6 +56,7 @@ log_enabled = False                         # so far cannot be enabled during ru
 # GUI flags and audio
 audio_enabled = False
 debug_enabled = False
+peaks_enabled = False                       # peak detection + tracking, '--peaks' or key 'k'
 
 # input mode for cmd "x <val1> <val2>" via Matplotlib-Window
 input_mode = False         # True, after x was entered and more parameter to come
@@ -64,12 +72,41 @@ DBM_MIN = -110
 DBM_MAX_WF = -40
 DBM_MIN_WF = -90
 
-# waterfall lines (history)
+# waterfall lines (history), colormap and source (scan column or host trace, '--wf-source')
 WF_ROWS = 200
+WF_CMAP = "viridis"
+WF_SOURCE = "max"
+
+# host-side traces (see lib/detectors.py), '--trace <name>=<kind>:<param>[:<source>]'
+traces = dtc.TraceBank()
+
+# peak detection and tracking (see lib/peaks.py)
+PEAK_SOURCE     = "max"                     # scan column or host trace used for peak detection
+PEAK_THRESHOLD  = -80                       # dBm
+PEAK_PROMINENCE = 6                         # dB
+PEAK_WIDTH      = 1                         # bins
+PEAK_LABELS_MAX = 20                        # max. labelled markers in spectrum
+
+# Audio, loaded on demand by load_audio()
+ali = None
 
-# Audio init
-ali.DBM_MAX = DBM_MAX
-ali.DBM_MIN = DBM_MIN
+# headless mode (no GUI, no matplotlib), e.g. for logging/tracking
+headless = False
+max_frames = 0                              # headless: stop after n scans (0 = endless)
+first_frame_done = False
+
+# adaptive sweep scheduler (see lib/scheduler.py), '--adaptive', only with device
+adaptive = False
+adaptive_dwell_s = sch.DWELL_S
+scheduler = None
+
+# protocol classifier (see lib/protocols.py), '--protocols'
+classifier = None
+PROTO_DETECT = 0.5                          # confidence above = protocol reported as present
+proto_present = set()
+
+# mask-triggered event capture (see lib/capture.py), '--capture <mask>'
+capture = None
 
 # Global timing values
 gScanInterval_ms = None                 # interval of power integration for avg (multiple sweeps)
@@ -81,6 +118,7 @@ last_scan      = None
 # Serial-Reader-Thread
 # -------------------------------------------------------------
 scan_queue    = queue.Queue()
+frame_pool    = sfr.FramePool()          # recycled ScanFrames (reader -> animate -> pool)
 console_queue = queue.Queue(maxsize=300)
 running = True
 
@@ -105,15 +143,22 @@ def serial_reader_thread():
                 if not line_str:
                     continue
             
-                # Scan-JSON
+                # Scan-JSON or binary scan frame
                 #my_print(timestamp(0), "Debug: serial_reader_thread: new linestr: %s" % (line_str[0:5]))
-                scan = parse_scan_json(line_str)
+                scan = parse_scan_line(line_str)
                 if scan is not None:
-                    # enqueue parsed scan
-                    scan_queue.put(scan)
-                    # log raw JSON line
+                    # log raw JSON/binary line
                     if log_enabled:
                         log_json_line(line_str)
+                    # adaptive sweep: in Vollbereichs-Frame einmischen, ggf. x/Intervall senden
+                    if scheduler is not None:
+                        scan, msg = scheduler.feed(scan)
+                        if msg:
+                            report(msg)
+                        if scan is None:
+                            continue
+                    # enqueue parsed scan
+                    scan_queue.put(scan)
                 else:
                     # Normale Konsolenzeile
                     if console_queue.full():
@@ -158,43 +203,67 @@ def parse_scan_json(line: str):
     if not isinstance(channels, list) or len(channels) == 0:
         return None
 
-    freqs = []
-    avg   = []
-    mn    = []
-    mx    = []
-    hold  = []
+    frame = frame_pool.acquire(len(channels))
+    try:
+        # Normalfall: alle Einträge [freq, avg, min, max, hold] -> direkt in den Block
+        frame.block[:frame.n] = channels
+    except (ValueError, TypeError, OverflowError):
+        # einzelne Einträge fehlerhaft -> zeilenweise, ungültige überspringen
+        n = 0
+        for entry in channels:
+            # Erwartet: [freq, avg, min, max, hold]
+            if not isinstance(entry, list) or len(entry) < 5:
+                continue
+            try:
+                frame.block[n] = entry[:5]
+            except (ValueError, TypeError, OverflowError):
+                continue
+            n += 1
+        if n == 0:
+            frame_pool.release(frame)
+            return None
+        frame.resize(n)
 
-    for entry in channels:
-        # Erwartet: [freq, avg, min, max, hold]
-        if not isinstance(entry, list) or len(entry) < 5:
-            continue
-        try:
-            f  = int(entry[0])
-            a  = int(entry[1])
-            mi = int(entry[2])
-            ma = int(entry[3])
-            h  = int(entry[4])
-        except (ValueError, TypeError):
-            continue
+    #my_print(timestamp(0), "Debug: parse_scan_json: new data appended")
+    frame.scanint_ms  = gScanInterval_ms
+    frame.sweep_ms    = gSweepTime_ms
+    frame.interval_ms = int(obj.get("scan", 0))
+    frame.t           = time.time()
+    return frame
 
-        freqs.append(f)
-        avg.append(a)
-        mn.append(mi)
-        mx.append(ma)
-        hold.append(h)
+# -------------------------------------------------------------
+# Parser für binäre Scan-Frames ("~<base64>", siehe lib/binframe.py)
+# -------------------------------------------------------------
+def parse_scan_bin(line: str):
+    global gScanInterval_ms, gSweepTime_ms
 
-    if not freqs:
+    try:
+        raw = bfr.line_to_frame(line)
+        scanint_ms, sweep_ms, f0, step, n = bfr.decode_header(raw)
+    except bfr.FrameError as e:
+        if debug_enabled:
+            print(f"Binary frame error: {e}", file=sys.stderr)
         return None
 
-    #my_print(timestamp(0), "Debug: parse_scan_json: new data appended")
-    return {
-        "freqs": np.array(freqs, dtype=np.int32),
-        "avg":   np.array(avg,   dtype=np.int16),
-        "min":   np.array(mn,    dtype=np.int16),
-        "max":   np.array(mx,    dtype=np.int16),
-        "hold":  np.array(hold,  dtype=np.int16),
-        "interval_ms": int(obj.get("scan", 0)),
-    }
+    gScanInterval_ms = scanint_ms
+    gSweepTime_ms = sweep_ms
+
+    # direkt in einen Frame aus dem Pool dekodieren
+    frame = frame_pool.acquire(n)
+    frame.set_freq_ramp(f0, step)
+    bfr.decode_columns(raw, n, out=frame.cols)
+    frame.scanint_ms  = scanint_ms
+    frame.sweep_ms    = sweep_ms
+    frame.interval_ms = 0
+    frame.t           = time.time()
+    return frame
+
+def parse_scan_line(line: str):
+    """Erkennt das Format pro Zeile: binärer Frame oder JSON (Fallback)."""
+    line = line.strip()
+    if bfr.is_binary_line(line):
+        return parse_scan_bin(line)
+    return parse_scan_json(line)
 
 def log_json_line(line: str):
     """Append a single JSON line to the log file (if enabled)."""
@@ -220,6 +289,7 @@ def log_json_line(line: str):
 def auto_detect_port():
     if SERIAL_PORT:
         return SERIAL_PORT
+    import serial.tools.list_ports
     ports = list(serial.tools.list_ports.comports())
     if not ports:
         raise RuntimeError("No serial ports found")
@@ -230,6 +300,7 @@ def auto_detect_port():
 def open_serial():
     """Öffnet die serielle Schnittstelle."""
     global ser
+    import serial
     port = auto_detect_port()
     print(f"Opening serial port {port} @ {BAUDRATE}...")
     ser = serial.Serial(port, BAUDRATE, timeout=0.1, rtscts=True, dsrdtr=False)
@@ -261,11 +332,11 @@ def replay_reader_thread():
                 line_str = line.strip()
                 if not line_str:
                     continue
-                scan = parse_scan_json(line_str)
+                scan = parse_scan_line(line_str)
                 if scan is not None:
                     scan_queue.put(scan)
                     # optional: respect interval from data
-                    interval_ms = scan.get("interval_ms", 0)
+                    interval_ms = scan.interval_ms
                     if interval_ms > 0:
                         time.sleep(interval_ms / 1000.0)
                     else:
@@ -277,81 +348,102 @@ def replay_reader_thread():
 # -------------------------------------------------------------
 # Matplotlib GUI
 # -------------------------------------------------------------
-plt.style.use("ggplot")
-plt.rcParams['toolbar'] = 'none'                             # no toolbar
-plt.rcParams['keymap.yscale'].remove('l')                    # no toggle of logaritmic scale
-fig = plt.figure(figsize=(13, 7))
-fig.canvas.manager.set_window_title(APPNAME + 'ver'+ APPVERSION + ': ' + APPDESCRIPTION)
-
-# Hinweis-Texte in Fenster-Koordinaten (0..1)
-fig.text(
-    0.5, 0.05,                                             # x, y (Fenster-Koordinaten 0...1)
-    APPCMD,                                                 # Text
-    ha="center", va="top",
-    fontsize=10, color="black",
-    bbox=dict(facecolor="black", alpha=0.2, pad=3)
-)
-status_text = fig.text(0.99, 0.98, "Sweep duration: waiting", ha="right", va="top", c="blue")
-
-# Layout:
-#  - obere Hälfte: Spektrum
-#  - mittlere Hälfte: Wasserfall
-#  - unterer Streifen: Console (ein-/ausblendbar)
-gs = fig.add_gridspec(3, 1, height_ratios=[5, 5, 2])
-gs.update(hspace=0.5)
-
-ax_spec    = fig.add_subplot(gs[0])
-ax_wf      = fig.add_subplot(gs[1])
-ax_console = fig.add_subplot(gs[2])
-
-# Placeholder-Objekte
-spec_scatter_hold = ax_spec.scatter([], [], s=20, c="blue", marker="^", label="HoldM")
-spec_line_max,  = ax_spec.plot([], [], label="MAX")
-spec_line_avg,  = ax_spec.plot([], [], label="AVG")
-spec_line_min,  = ax_spec.plot([], [], label="MIN")
-
-# spectrum part
-ax_spec.set_ylabel("RSSI [dBm]", fontsize=10,)
-ax_spec.set_xlabel("Frequency [MHz]", fontsize=10,)
-ax_spec.set_ylim(DBM_MIN, DBM_MAX)
-leg_spec=ax_spec.legend(loc="upper right",
-    #borderpad=0.2,
-    labelspacing=0.1,
-    fontsize=9, 
-    bbox_to_anchor=(1.00, 0.94))
-leg_spec.get_frame().set_alpha(0.2)
-for txt in leg_spec.get_texts():
-    txt.set_color("#777777")            # soft-grey
-ax_spec.grid(True)
-ax_spec.grid(True, which="minor")
-ax_spec.minorticks_on()
-
-# waterfall part
-wf_im = ax_wf.imshow(
-    np.zeros((WF_ROWS, 10)),                # placeholder, wird später korrekt dimensioniert
-    aspect="auto",
-    origin="lower",
-    extent=[0, 10, 0, WF_ROWS],
-    vmin=DBM_MIN_WF,
-    vmax=DBM_MAX_WF,
-    cmap="viridis",
-)
-ax_wf.set_ylabel("Time (older → up)", fontsize=10,)
-ax_wf.set_xlabel("Frequency [MHz]", fontsize=10,)
-ax_wf.minorticks_on()
-ax_wf.grid(True, color="white", alpha=0.5, linewidth=0.3)
-
-# console part
-ax_console.set_title("Command interface, device view", fontsize=10, loc='left')
+fig = None
+ax_spec = ax_wf = ax_console = None
+spec_scatter_hold = spec_line_max = spec_line_avg = spec_line_min = None
+spec_scatter_peaks = None
+spec_trace_lines = {}                       # host trace name -> Line2D
+spec_peak_labels = []                       # Text-Objekte, werden wiederverwendet
+wf_im = status_text = console_text = proto_text = None
 console_visible = True
-console_text = ax_console.text(
-    0.0, 1.0, "",
-    va="top", ha="left",
-    fontsize=8,
-    family="monospace",
-    transform=ax_console.transAxes,
-)
-ax_console.set_axis_off()
+
+def build_gui():
+    """Importiert matplotlib und baut das Fenster (erst nach dem Parsen der Argumente)."""
+    global fig, ax_spec, ax_wf, ax_console
+    global spec_scatter_hold, spec_line_max, spec_line_avg, spec_line_min, spec_scatter_peaks
+    global wf_im, status_text, console_text, proto_text
+    import matplotlib.pyplot as plt
+
+    plt.style.use("ggplot")
+    plt.rcParams['toolbar'] = 'none'                             # no toolbar
+    plt.rcParams['keymap.yscale'].remove('l')                    # no toggle of logaritmic scale
+    fig = plt.figure(figsize=(13, 7))
+    fig.canvas.manager.set_window_title(APPNAME + 'ver'+ APPVERSION + ': ' + APPDESCRIPTION)
+
+    # Hinweis-Texte in Fenster-Koordinaten (0..1)
+    fig.text(
+        0.5, 0.05,                                             # x, y (Fenster-Koordinaten 0...1)
+        APPCMD,                                                 # Text
+        ha="center", va="top",
+        fontsize=10, color="black",
+        bbox=dict(facecolor="black", alpha=0.2, pad=3)
+    )
+    status_text = fig.text(0.99, 0.98, "Sweep duration: waiting", ha="right", va="top", c="blue")
+    proto_text = fig.text(0.01, 0.98, "", ha="left", va="top", fontsize=9, c="purple")
+
+    # Layout:
+    #  - obere Hälfte: Spektrum
+    #  - mittlere Hälfte: Wasserfall
+    #  - unterer Streifen: Console (ein-/ausblendbar)
+    gs = fig.add_gridspec(3, 1, height_ratios=[5, 5, 2])
+    gs.update(hspace=0.5)
+
+    ax_spec    = fig.add_subplot(gs[0])
+    ax_wf      = fig.add_subplot(gs[1])
+    ax_console = fig.add_subplot(gs[2])
+
+    # Placeholder-Objekte
+    spec_scatter_hold = ax_spec.scatter([], [], s=20, c="blue", marker="^", label="HoldM")
+    spec_line_max,  = ax_spec.plot([], [], label="MAX")
+    spec_line_avg,  = ax_spec.plot([], [], label="AVG")
+    spec_line_min,  = ax_spec.plot([], [], label="MIN")
+    for name in traces.names():
+        spec_trace_lines[name], = ax_spec.plot([], [], linestyle="--", linewidth=1.0, label=name)
+    spec_scatter_peaks = ax_spec.scatter([], [], s=40, c="red", marker="v", zorder=5)
+
+    # spectrum part
+    ax_spec.set_ylabel("RSSI [dBm]", fontsize=10,)
+    ax_spec.set_xlabel("Frequency [MHz]", fontsize=10,)
+    ax_spec.set_ylim(DBM_MIN, DBM_MAX)
+    leg_spec=ax_spec.legend(loc="upper right",
+        #borderpad=0.2,
+        labelspacing=0.1,
+        fontsize=9, 
+        bbox_to_anchor=(1.00, 0.94))
+    leg_spec.get_frame().set_alpha(0.2)
+    for txt in leg_spec.get_texts():
+        txt.set_color("#777777")            # soft-grey
+    ax_spec.grid(True)
+    ax_spec.grid(True, which="minor")
+    ax_spec.minorticks_on()
+
+    # waterfall part
+    wf_im = ax_wf.imshow(
+        np.zeros((WF_ROWS, 10)),                # placeholder, wird später korrekt dimensioniert
+        aspect="auto",
+        origin="lower",
+        extent=[0, 10, 0, WF_ROWS],
+        vmin=DBM_MIN_WF,
+        vmax=DBM_MAX_WF,
+        cmap=WF_CMAP,
+    )
+    ax_wf.set_ylabel("Time (older → up)", fontsize=10,)
+    ax_wf.set_xlabel("Frequency [MHz]", fontsize=10,)
+    ax_wf.minorticks_on()
+    ax_wf.grid(True, color="white", alpha=0.5, linewidth=0.3)
+
+    # console part
+    ax_console.set_title("Command interface, device view", fontsize=10, loc='left')
+    console_text = ax_console.text(
+        0.0, 1.0, "",
+        va="top", ha="left",
+        fontsize=8,
+        family="monospace",
+        transform=ax_console.transAxes,
+    )
+    ax_console.set_axis_off()
+
+    fig.canvas.mpl_connect("key_press_event", on_key)
 
 
 # -------------------------------------------------------------
@@ -378,6 +470,32 @@ def update_console_ax():
     console_text.set_text(txt)
 
 
+# -------------------------------------------------------------
+# Peak-Marker im Spektrum
+# -------------------------------------------------------------
+peak_tracker = None
+
+def update_peak_markers(tracks):
+    """Zeichnet die aktuell gesehenen Tracks als Marker mit Track-ID."""
+    tracks = sorted(tracks, key=lambda tr: tr.p_max, reverse=True)[:PEAK_LABELS_MAX]
+    if tracks:
+        offs = np.array([(tr.f_center, tr.p_max) for tr in tracks], dtype=np.float32)
+    else:
+        offs = np.zeros((0, 2))
+    spec_scatter_peaks.set_offsets(offs)
+
+    while len(spec_peak_labels) < len(tracks):
+        spec_peak_labels.append(ax_spec.text(0, 0, "", fontsize=8, color="red",
+                                             ha="center", va="bottom", clip_on=True))
+    for i, txt in enumerate(spec_peak_labels):
+        if i < len(tracks):
+            txt.set_position((offs[i, 0], offs[i, 1] + 1.5))
+            txt.set_text(f"T{tracks[i].id}")
+            txt.set_visible(True)
+        else:
+            txt.set_visible(False)
+
+
 # -------------------------------------------------
 # Channel definitions for 2.4 GHz
 # -------------------------------------------------
@@ -514,7 +632,7 @@ def draw_5g_bands(ax, fmin, fmax):
 # Input Key-Handler
 # -------------------------------------------------------------
 def on_key(event):
-    global console_visible, audio_enabled
+    global console_visible, audio_enabled, peaks_enabled
     global input_mode, input_buffer
 
     if event.key is None:
@@ -579,9 +697,11 @@ def on_key(event):
         send_command('j')
         console_queue.put(">> j (toggle json)")
     elif k == 'n':
+        reset_scheduler(2400, 2500)
         send_command('n')
         console_queue.put(">> n (reset freq.range default)")
     elif k == 'l':
+        reset_scheduler(2360, 2460)
         send_command('l')
         console_queue.put(">> l (set freq.range to low)")
     elif k in ['!', '.', '1', '2', '5', '0']:
@@ -592,20 +712,33 @@ def on_key(event):
 
     # local commands for gui
     elif k == 'a':
-        audio_enabled = not audio_enabled
+        audio_enabled = not audio_enabled and load_audio()
         console_queue.put(f">> a (audio={audio_enabled})")
     elif k == 'd':
         console_visible = not console_visible
         console_queue.put(f">> d (console_visible={console_visible})")
+    elif k == 'k':
+        peaks_enabled = not peaks_enabled
+        if not peaks_enabled:
+            peak_tracker.reset()
+            update_peak_markers([])
+        console_queue.put(f">> k (peak tracking={peaks_enabled})")
+    elif k == 'r':
+        traces.reset()
+        console_queue.put(">> r (reset host traces)")
 
     else:
         # andere Keys ignorieren oder ggf. direkt senden
         pass
-    
-fig.canvas.mpl_connect("key_press_event", on_key)
 
 
 
+# manual range change: adaptive scheduler waits for the new full range f1..f2
+def reset_scheduler(f1=None, f2=None):
+    if scheduler is not None:
+        scheduler.reset(f1, f2)
+
+
 # parsing of values in x-input mode (frequency setting)
 def handle_x_command_from_buffer():
     """
@@ -628,6 +761,7 @@ def handle_x_command_from_buffer():
         return
 
     v1, v2 = m.group(1), m.group(2)
+    reset_scheduler(int(v1), int(v2))
     # send command via UART
     send_command(s+'\n')                            # sendet inklusive '\n'
     #my_print(timestamp(0), "Debug: x-cmd send")
@@ -639,25 +773,110 @@ def handle_x_command_from_buffer():
     input_buffer = ""
 
 
+# -------------------------------------------------------------
+# Audio bei Bedarf laden
+# -------------------------------------------------------------
+def load_audio():
+    """Importiert lib.audio beim ersten Aufruf. Liefert True, wenn Audio verfügbar ist."""
+    global ali
+    if ali is None:
+        import lib.audio as audio_lib
+        audio_lib.DBM_MAX = DBM_MAX
+        audio_lib.DBM_MIN = DBM_MIN
+        ali = audio_lib
+    if not ali.HAVE_AUDIO:
+        console_queue.put(">> audio not available (sounddevice missing)")
+    return ali.HAVE_AUDIO
+
+
 # -------------------------------------------------------------
 # Wasserfall-Datenpuffer
 # -------------------------------------------------------------
-wf_data = None          # 2D: WF_ROWS x num_channels
+wf_buf = None           # lib.waterfall.RgbaWaterfall: WF_ROWS x num_channels, dBm + RGBA
 wf_lock = threading.Lock()
 
 def init_waterfall(num_channels: int):
     """Initialisiert den Wasserfall-Puffer mit num_channels Spalten."""
-    global wf_data
-    wf_data = np.full((WF_ROWS, num_channels), DBM_MIN_WF, dtype=np.float32)
+    global wf_buf
+    wf_buf = wfl.RgbaWaterfall(WF_ROWS, num_channels, DBM_MIN_WF, DBM_MAX_WF, WF_CMAP)
 
 def add_scan_to_waterfall(values: np.ndarray):
-    """Schiebt eine neue Zeile in den Wasserfall (unterste Zeile = neueste)."""
-    global wf_data
-    if wf_data is None:
+    """Neue Zeile in den Wasserfall (neueste = letzte Zeile), nur diese wird eingefärbt."""
+    if wf_buf is None:
         return
     with wf_lock:
-        wf_data[:-1, :] = wf_data[1:, :]
-        wf_data[-1, :]  = values
+        # Bereich/Colormap geändert -> einmalig komplett neu einfärben
+        wf_buf.set_clim(DBM_MIN_WF, DBM_MAX_WF)
+        wf_buf.set_cmap(WF_CMAP)
+        wf_buf.push(values)
+
+
+# -------------------------------------------------------------
+# Verarbeitung je Scan (GUI und headless)
+# -------------------------------------------------------------
+def report(msg: str):
+    """Meldung in die GUI-Konsole bzw. auf stdout im headless-Modus."""
+    if headless:
+        my_print(timestamp(0), msg)
+    elif not console_queue.full():
+        console_queue.put(f">> {msg}")
+
+proc_range = None                           # (f0, n) of the last processed scan
+
+def process_scan(s):
+    """Auswertungen eines neuen Scans ohne Darstellung (für jeden Scan). Liefert die gesehenen Tracks."""
+    global first_frame_done, proc_range
+    if not first_frame_done:
+        first_frame_done = True
+        my_print(timestamp(0), f"first frame after {(time.perf_counter() - T_START) * 1000:.0f} ms")
+
+    # neuer Frequenzbereich: laufende Tracks abschließen, Host-Traces neu starten
+    rng = (int(s.freqs[0]), s.n)
+    if rng != proc_range:
+        proc_range = rng
+        peak_tracker.reset()
+        traces.reset()
+        if headless:
+            my_print(timestamp(0), f"range {s.freqs[0]}...{s.freqs[-1]} MHz, sweep {gSweepTime_ms} ms")
+
+    # Pre-Trigger-Ringpuffer und Maskenprüfung
+    if capture is not None:
+        msg = capture.feed(s)
+        if msg:
+            report(msg)
+
+    # Host-Traces (Hold/Mittelung), in place
+    traces.update(s)
+
+    # Protokolle klassifizieren (nur vollständig gemessene Scans), Wechsel melden
+    if classifier is not None and s.fresh is None:
+        conf = classifier.update(s.freqs, s.max, s.t)
+        for p, c in conf.items():
+            if (c >= PROTO_DETECT) != (p in proto_present):
+                proto_present.symmetric_difference_update((p,))
+                report(f"protocol {p} {'detected' if c >= PROTO_DETECT else 'gone'} ({c:.2f})")
+
+    # Peaks erkennen und über Scans verfolgen
+    if peaks_enabled:
+        return peak_tracker.update(s.freqs, traces.values(PEAK_SOURCE, s), s.t, s.fresh)
+    return None
+
+def headless_loop(reader):
+    """Ersetzt FuncAnimation im headless-Modus: verarbeitet alle Scans bis Ende/Ctrl+C."""
+    n = 0
+    while running:
+        try:
+            s = scan_queue.get(timeout=0.5)
+        except queue.Empty:
+            if not reader.is_alive():
+                break                           # replay beendet
+            continue
+        process_scan(s)
+        frame_pool.release(s)
+        n += 1
+        if max_frames and n >= max_frames:
+            break
+    print()
 
 
 # -------------------------------------------------------------
@@ -670,9 +889,10 @@ def init_animation():
     spec_line_min.set_data([], [])
     spec_line_max.set_data([], [])
     spec_scatter_hold.set_offsets(np.zeros((0, 2)))
+    spec_scatter_peaks.set_offsets(np.zeros((0, 2)))
     wf_im.set_data(np.zeros((WF_ROWS, 10)))
     freq0_last = None
-    return spec_line_avg, spec_line_min, spec_line_max, spec_scatter_hold, wf_im, console_text
+    return spec_line_avg, spec_line_min, spec_line_max, spec_scatter_hold, spec_scatter_peaks, wf_im, console_text
 
 
 # -------------------------------------------------------------
@@ -682,11 +902,15 @@ def animate(frame):
     """Wird periodisch von FuncAnimation aufgerufen, um das GUI zu aktualisieren."""
     global last_scan, freq0_last, freq_range_last
 
-    # Neuen Scan aus Queue ziehen (wenn vorhanden; letzter gewinnt)
+    # Neue Scans aus Queue ziehen: jeder wird ausgewertet, angezeigt wird der letzte
+    # übersprungene und der zuletzt angezeigte Frame gehen zurück in den Pool
     new_data = False
+    seen = None
     try:
         while True:
             scan = scan_queue.get_nowait()
+            seen = process_scan(scan)
+            frame_pool.release(last_scan)
             last_scan = scan
             new_data = True
     except queue.Empty:
@@ -694,11 +918,10 @@ def animate(frame):
 
     if new_data:
         s = last_scan
-        freqs = s["freqs"]
-        avg   = s["avg"].astype(np.float32)
-        mn    = s["min"].astype(np.float32)
-        mx    = s["max"].astype(np.float32)
-        hold  = s["hold"].astype(np.float32)
+        freqs = s.freqs                     # int16-Views in den Frame-Block, keine Kopien
+        avg   = s.avg
+        mn    = s.min
+        mx    = s.max
 
         # adapt x-range of diagrams
         if freqs.size > 0 and (freq0_last == None or freq_range_last != freqs.size or freq0_last != freqs[0]):
@@ -719,33 +942,77 @@ def animate(frame):
         spec_line_avg.set_data(freqs, avg)
         spec_line_min.set_data(freqs, mn)
         spec_line_max.set_data(freqs, mx)
-        spec_scatter_hold.set_offsets(np.column_stack((freqs, hold)))
+        spec_scatter_hold.set_offsets(s.freq_hold)
+
+        if classifier is not None:
+            proto_text.set_text(classifier.summary())
 
-        # Wasserfall aktualisieren (mit MAX-Werten)
-        if wf_data is not None:
-            add_scan_to_waterfall(mx)
+        # Host-Traces und Peak-Marker
+        if seen is not None:
+            update_peak_markers(seen)
+        for name, line in spec_trace_lines.items():
+            line.set_data(freqs, traces.values(name))
+
+        # Wasserfall aktualisieren (WF_SOURCE, default MAX), fertiges RGBA-Bild -> kein Normieren/Colormap in matplotlib
+        if wf_buf is not None:
+            add_scan_to_waterfall(traces.values(WF_SOURCE, s))
             with wf_lock:
-                wf_im.set_data(wf_data)
-            wf_im.set_clim(DBM_MIN_WF, DBM_MAX_WF)
+                wf_im.set_data(wf_buf.image)
         
         # Audio
-        if audio_enabled and ali.HAVE_AUDIO:
+        if audio_enabled:
             ali.play_audio(mx)
 
 
     # Console aktualisieren
     update_console_ax()
-    return spec_line_avg, spec_line_min, spec_line_max, spec_scatter_hold, wf_im, console_text
+    return spec_line_avg, spec_line_min, spec_line_max, spec_scatter_hold, spec_scatter_peaks, wf_im, console_text
 
 
 def parse_stdin_cmdline():
-    global REPLAY_MODE, INFILE_PATH, LOGFILE_PATH, log_enabled
+    global REPLAY_MODE, INFILE_PATH, LOGFILE_PATH, log_enabled, peaks_enabled
+    global headless, max_frames, capture, WF_SOURCE, adaptive, adaptive_dwell_s, classifier
     parser = argparse.ArgumentParser(description="nRF52840 Power Scanner JSON monitor")
     # todo parameter for serial-if and gui config
     parser.add_argument("--infile", help="Replay JSON log file instead of reading from serial port, e.g. '--infile json_in.log'")
     parser.add_argument("--logfile", help="Replay JSON log file instead of reading from serial port, e.g. '--logfile json_out.log'")
+    parser.add_argument("--peaks", action="store_true", help="enable peak detection and signal tracking at start (toggle with key 'k')")
+    parser.add_argument("--headless", action="store_true", help="no GUI, only process/log the scans (matplotlib is not loaded)")
+    parser.add_argument("--frames", type=int, default=0, help="headless: stop after n scans, e.g. '--frames 100'")
+    parser.add_argument("--capture", metavar="MASK", help="save pre/post-trigger scans when MASK is violated, e.g. '--capture 2400-2420:-60,2430-2480:-50' or mask file")
+    parser.add_argument("--pretrig", type=float, default=cap.PRETRIG_S, help="capture: seconds before trigger (default %(default)s)")
+    parser.add_argument("--posttrig", type=float, default=cap.POSTTRIG_S, help="capture: seconds after trigger (default %(default)s)")
+    parser.add_argument("--trace", action="append", default=[], metavar="SPEC",
+                        help="host trace '<name>=<kind>:<param>[:<source>]', kind: maxhold/minhold (N scans), ema (alpha), decay (dB/scan), e.g. '--trace max20=maxhold:20'")
+    parser.add_argument("--wf-source", default=WF_SOURCE, help="waterfall source: avg/min/max/hold or a trace name (default %(default)s)")
+    parser.add_argument("--adaptive", action="store_true", help="adaptive sweep: dwell on active sub-bands at fast interval, interleaved with full sweeps (device only)")
+    parser.add_argument("--dwell", type=float, default=sch.DWELL_S, help="adaptive: seconds on a sub-band between full sweeps (default %(default)s)")
+    parser.add_argument("--protocols", action="store_true", help="classify WiFi/BLE/ZigBee/nRF24 activity (confidence shown top left)")
     args = parser.parse_args()
-    
+
+    if args.protocols:
+        classifier = prt.ProtocolClassifier()
+    adaptive = args.adaptive
+    adaptive_dwell_s = args.dwell
+
+    for spec in args.trace:
+        try:
+            traces.add(*dtc.parse_trace(spec))
+        except ValueError as e:
+            parser.error(str(e))
+    if args.wf_source not in dtc.SOURCES and args.wf_source not in traces.traces:
+        parser.error(f"unknown waterfall source '{args.wf_source}'")
+    WF_SOURCE = args.wf_source
+
+    if args.capture:
+        try:
+            capture = cap.EventCapture(cap.parse_mask(args.capture), args.pretrig, args.posttrig)
+        except ValueError as e:
+            parser.error(str(e))
+
+    headless = args.headless
+    max_frames = args.frames
+    peaks_enabled = args.peaks
     REPLAY_MODE = False
     if args.infile:
         REPLAY_MODE = True
@@ -782,16 +1049,24 @@ def main():
     global REPLAY_MODE, INFILE_PATH
     global gScanInterval_ms, gSweepTime_ms                  # from json stream
     
+    global peak_tracker, scheduler
+
     # read and evalue stdin command-line parameter
     parse_stdin_cmdline()
+
+    peak_tracker = pks.PeakTracker(threshold=PEAK_THRESHOLD, prominence=PEAK_PROMINENCE, width=PEAK_WIDTH)
     
     # Reader-Thread starten: Serial oder Replay
     if REPLAY_MODE:
         t = threading.Thread(target=replay_reader_thread, daemon=True)
         console_queue.put(f">> playback file: %s, no command action to device possible, only audio ON/OFF via character 'a', Exit with 'q'" % (INFILE_PATH))
+        if adaptive:
+            print("--adaptive needs a device, ignored in playback", file=sys.stderr)
     else:
         open_serial()
         send_command('JP.')                      # switch nrf to json und aktivate periodical output with scan interval 0.5sec
+        if adaptive:
+            scheduler = sch.SweepScheduler(send_command, frame_pool, dwell_s=adaptive_dwell_s)
         t = threading.Thread(target=serial_reader_thread, daemon=True)
         # open JSON log file (append mode)
         if log_enabled:
@@ -802,21 +1077,43 @@ def main():
                 log_file = None
     t.start()
 
-    ani = FuncAnimation(
-        fig,
-        animate,
-        init_func=init_animation,
-        interval=200,  # ms
-        blit=False,
-        cache_frame_data=False,                     # <-- WICHTIG: Frame-Caching abschalten
-    )
-
     try:
-        plt.show()
+        if headless:
+            headless_loop(t)
+        else:
+            # GUI erst jetzt laden und aufbauen
+            import matplotlib.pyplot as plt
+            from matplotlib.animation import FuncAnimation
+            build_gui()
+            ani = FuncAnimation(
+                fig,
+                animate,
+                init_func=init_animation,
+                interval=200,  # ms
+                blit=False,
+                cache_frame_data=False,                     # <-- WICHTIG: Frame-Caching abschalten
+            )
+            plt.show()
+    except KeyboardInterrupt:
+        pass
     finally:
         running = False
         time.sleep(0.1)
+        # offenen Capture-Trigger noch schreiben, auf Schreib-Threads warten
+        if capture is not None:
+            msg = capture.close()
+            if msg:
+                print(msg)
+        # Zusammenfassung der erkannten Signale
+        peak_tracker.reset()
+        if peak_tracker.history:
+            print(f"\n{len(peak_tracker.history)} tracked signals (last {peak_tracker.history.maxlen}):")
+            for tr in peak_tracker.history:
+                if tr.hits > 1:
+                    print(tr)
         if ser is not None and ser.is_open:
+            if scheduler is not None:
+                scheduler.restore()             # Gerät nicht im Sub-Band/0.25 s zurücklassen
             ser.close()
         # close logfile
         if log_enabled and log_file is not None:
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Startup benchmark for FrequencyMonitor.py, guards against regressions:
+#  1. importing FrequencyMonitor must not load matplotlib/serial/sounddevice
+#  2. sounddevice must load with a real PortAudio library, otherwise versions
+#     that import audio eagerly are measured without its import cost
+#  3. import, first frame (headless replay) and first drawn GUI frame (replay,
+#     matplotlib Agg backend: the probe replaces plt.show() and returns after
+#     the first animate() with data) must not be slower than a baseline run of
+#     another git revision by more than a tolerance. The baseline is checked out
+#     into a temporary git worktree and measured interleaved with this tree.
+#     Compared is the median CPU time (user+sys) of the probe process, which
+#     scatters much less than wall time on a loaded machine, and with a wider
+#     tolerance the median wall time, which also catches waits (sleep, I/O).
+#
+# python bench_startup.py                                   # vs. HEAD, exit code 1 if a check fails
+# python bench_startup.py --baseline 4914e3d --repeat 8     # vs. version before lazy imports
+# python bench_startup.py --baseline ""                     # only measure, no baseline
+
+import argparse
+import os
+import resource
+import shutil
+import subprocess
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+TOLERANCE      = 0.10       # allowed slowdown vs. baseline, median CPU time
+WALL_TOLERANCE = 0.20       # allowed slowdown vs. baseline, median wall time
+
+LAZY_MODULES = ("matplotlib", "serial", "sounddevice", "lib.audio")
+
+IMPORT_PROBE = (
+    "import sys, FrequencyMonitor; "
+    "print(*[m for m in %r if m in sys.modules])" % (LAZY_MODULES,)
+)
+
+AUDIO_PROBE = (
+    "import time; t = time.perf_counter(); import sounddevice as sd; "
+    "print((time.perf_counter() - t) * 1000, sd.get_portaudio_version()[1])"
+)
+
+GUI_PROBE = """
+import sys, time, matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import FrequencyMonitor as fm
+
+def show(*args, **kwargs):
+    fm.init_animation()
+    t_end = time.time() + 10
+    while len(fm.spec_line_max.get_xdata()) == 0 and time.time() < t_end:
+        fm.animate(0)
+        time.sleep(0.01)
+    if len(fm.spec_line_max.get_xdata()) == 0:
+        sys.exit("no frame within 10 s")
+    fm.fig.canvas.draw()
+
+plt.show = show
+sys.argv = ["FrequencyMonitor.py", "--infile", sys.argv[1]]
+fm.main()
+"""
+
+
+def _run(args, cwd):
+    """Wall and CPU time of a subprocess in ms (process start .. exit) and its stdout, None if it fails."""
+    r0 = resource.getrusage(resource.RUSAGE_CHILDREN)
+    t0 = time.perf_counter()
+    r = subprocess.run(args, cwd=cwd, capture_output=True, text=True)
+    wall = (time.perf_counter() - t0) * 1000
+    r1 = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (r1.ru_utime + r1.ru_stime - r0.ru_utime - r0.ru_stime) * 1000
+    return (wall, cpu, r.stdout) if r.returncode == 0 else None
+
+def bench_audio():
+    """Import time of sounddevice in ms and PortAudio version, or (None, error message)."""
+    r = subprocess.run([sys.executable, "-c", AUDIO_PROBE], cwd=HERE, capture_output=True, text=True)
+    if r.returncode != 0:
+        lines = r.stderr.strip().splitlines() or [f"exit code {r.returncode}"]
+        return None, lines[-1]
+    dt, version = r.stdout.split(None, 1)
+    return float(dt), version.strip()
+
+def bench_import(cwd):
+    """Interpreter start + import of FrequencyMonitor; stdout lists the lazy modules it loaded."""
+    return _run([sys.executable, "-c", IMPORT_PROBE], cwd)
+
+def bench_first_frame(cwd, infile):
+    """Complete headless replay of one scan."""
+    return _run([sys.executable, "FrequencyMonitor.py", "--headless", "--frames", "1", "--infile", infile], cwd)
+
+def bench_gui_frame(cwd, infile):
+    """GUI replay up to the first drawn frame (Agg)."""
+    return _run([sys.executable, "-c", GUI_PROBE, infile], cwd)
+
+
+# -------------------------------------------------------------
+# Baseline: other git revision in a temporary worktree
+# -------------------------------------------------------------
+def add_worktree(rev):
+    """Checks out rev into a temporary git worktree, returns its gui directory."""
+    top = subprocess.run(["git", "rev-parse", "--show-toplevel"], cwd=HERE,
+                         capture_output=True, text=True, check=True).stdout.strip()
+    path = tempfile.mkdtemp(prefix="bench_startup_")
+    subprocess.run(["git", "worktree", "add", "--detach", path, rev], cwd=top,
+                   capture_output=True, check=True)
+    return path, os.path.join(path, os.path.relpath(HERE, top))
+
+def remove_worktree(path):
+    subprocess.run(["git", "worktree", "remove", "--force", path], cwd=HERE, capture_output=True)
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _stats(runs):
+    """(median CPU, median wall) in ms of the successful runs, None if all failed."""
+    runs = [r for r in runs if r is not None]
+    if not runs:
+        return None
+    return statistics.median(r[1] for r in runs), statistics.median(r[0] for r in runs)
+
+def _fmt(stats):
+    return f"cpu {stats[0]:5.0f} ms, wall {stats[1]:5.0f} ms" if stats else f"{'n/a':26s}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="startup benchmark of FrequencyMonitor.py")
+    parser.add_argument("--infile", default="scan_json.log", help="scan log for replay")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default="HEAD", metavar="REV",
+                        help="git revision to compare with (default %(default)s, '' = none)")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed CPU time slowdown vs. baseline (default %(default)s)")
+    parser.add_argument("--wall-tolerance", type=float, default=WALL_TOLERANCE,
+                        help="allowed wall time slowdown vs. baseline (default %(default)s)")
+    args = parser.parse_args()
+    infile = os.path.abspath(os.path.join(HERE, args.infile))
+
+    ok = True
+    t_audio, info = bench_audio()
+    if t_audio is None:
+        print(f"FAIL: sounddevice not loadable ({info}), install PortAudio to measure with the real audio import")
+        sys.exit(1)
+    print(f"sounddevice: {t_audio:.0f} ms import ({info})")
+
+    trees = {"current": HERE}
+    worktree = None
+    if args.baseline:
+        try:
+            worktree, trees["baseline"] = add_worktree(args.baseline)
+        except subprocess.CalledProcessError as e:
+            sys.exit(f"baseline {args.baseline!r}: {e.stderr.decode().strip()}")
+
+    benches = {
+        "import":      bench_import,
+        "first frame": lambda cwd: bench_first_frame(cwd, infile),
+        "GUI frame":   lambda cwd: bench_gui_frame(cwd, infile),
+    }
+    times = {(name, tree): [] for name in benches for tree in trees}
+    try:
+        # same start conditions: bytecode written for both trees (PYTHONDONTWRITEBYTECODE)
+        for cwd in trees.values():
+            subprocess.run([sys.executable, "-m", "compileall", "-q", cwd], capture_output=True)
+        r = bench_import(HERE)
+        loaded = r[2].split() if r else []
+        if loaded:
+            print(f"FAIL: import loads {', '.join(loaded)} eagerly")
+            ok = False
+        # interleaved, so drifting machine load hits both trees alike
+        for _ in range(args.repeat):
+            for name, bench in benches.items():
+                for tree, cwd in trees.items():
+                    times[name, tree].append(bench(cwd))
+    finally:
+        if worktree:
+            remove_worktree(worktree)
+
+    for name in benches:
+        cur = _stats(times[name, "current"])
+        line = f"{name + ':':13s}{_fmt(cur)}"
+        if cur is None:
+            line += "  FAIL: probe failed"
+            ok = False
+        elif "baseline" in trees:
+            base = _stats(times[name, "baseline"])
+            line += f" | baseline {_fmt(base)}"
+            if base is not None:
+                line += f"  cpu {cur[0] / base[0] - 1:+6.1%}, wall {cur[1] / base[1] - 1:+6.1%}"
+                if cur[0] > base[0] * (1 + args.tolerance):
+                    line += f"  FAIL: cpu > {args.tolerance:.0%} slower"
+                    ok = False
+                if cur[1] > base[1] * (1 + args.wall_tolerance):
+                    line += f"  FAIL: wall > {args.wall_tolerance:.0%} slower"
+                    ok = False
+        print(line)
+    print("(%d runs, process start .. exit; first frame headless, GUI frame Agg%s)"
+          % (args.repeat, f", baseline {args.baseline}" if args.baseline else ""))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,6 @@
 
 import sys
 import numpy as np
-import sounddevice as sd
 
 VERSION = "0.5.0"
 
@@ -20,7 +19,7 @@ DBM_MIN = -90
 try:
     import sounddevice as sd
     HAVE_AUDIO = True
-except ImportError:
+except (ImportError, OSError):                  # OSError: PortAudio library missing
     print("sounddevice not found, audio disabled", file=sys.stderr)
     HAVE_AUDIO = False
 
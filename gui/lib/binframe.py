@@ -0,0 +1,239 @@
+# helper lib for compact binary scan frames
+#
+# A JSON scan line with ~100 channels is about 2.5 KB, at 115200 baud that is
+# a noticeable part of a 0.25 s scan interval. The binary frame carries the
+# same content in roughly 1/5 of the size and is decoded without json.loads().
+#
+# Frame layout (little endian):
+#   offset  size  field
+#   0       2     magic  b"M2"
+#   2       1     version (BIN_VERSION)
+#   3       1     number of columns (4: avg, min, max, hold)
+#   4       2     scanint_ms  (u16)
+#   6       2     sweep_ms    (u16)
+#   8       2     f0 in MHz   (u16)
+#   10      1     freq step in MHz (u8, 1..255, frequencies rising)
+#   11      2     number of channels n (u16)
+#   13      n*4   columns avg/min/max/hold, each: first value absolute (int8),
+#                 followed by n-1 deltas to the previous channel (int8)
+#   13+4n   2     CRC-16/CCITT (binascii.crc_hqx, init 0xFFFF) over bytes 0..13+4n-1
+#
+# On the serial line (and in log files) a frame is sent as one text line:
+#   "~" + base64(frame) + "\n"
+# so the line based reader and the log/replay files keep working unchanged and
+# JSON lines ("{...}") can be mixed with binary lines.
+
+import sys
+import time
+import base64
+import binascii
+import json
+import struct
+import argparse
+
+import numpy as np
+
+BIN_MAGIC   = b"M2"
+BIN_VERSION = 1
+BIN_PREFIX  = "~"                   # line prefix of a base64 encoded frame
+
+COLUMNS = ("avg", "min", "max", "hold")
+
+_HEADER = struct.Struct("<2sBBHHHBH")
+_CRC    = struct.Struct("<H")
+
+
+class FrameError(ValueError):
+    """Raised for malformed binary frames (length, magic, checksum, ...)."""
+
+
+# -------------------------------------------------------------
+# Encoding
+# -------------------------------------------------------------
+def _delta_encode(col: np.ndarray) -> bytes:
+    col = np.asarray(col, dtype=np.int16)
+    delta = np.empty_like(col)
+    delta[0] = col[0]
+    np.subtract(col[1:], col[:-1], out=delta[1:])
+    if delta.min() < -128 or delta.max() > 127:
+        raise FrameError("column value/delta exceeds int8 range")
+    return delta.astype(np.int8).tobytes()
+
+def encode_frame(freqs, avg, mn, mx, hold, scanint_ms=0, sweep_ms=0) -> bytes:
+    """Packs one scan into a binary frame. freqs must be equidistant."""
+    freqs = np.asarray(freqs)
+    n = int(freqs.size)
+    if n == 0:
+        raise FrameError("empty scan")
+    step = int(freqs[1] - freqs[0]) if n > 1 else 1
+    if n > 1 and not np.all(np.diff(freqs) == step):
+        raise FrameError("frequencies are not equidistant")
+    if not 0 < step <= 0xFF:
+        raise FrameError(f"freq step {step} MHz not in 1..255")
+    if not 0 <= int(freqs[0]) <= 0xFFFF or n > 0xFFFF:
+        raise FrameError("f0 or number of channels exceeds u16 range")
+
+    head = _HEADER.pack(BIN_MAGIC, BIN_VERSION, len(COLUMNS),
+                        int(scanint_ms) & 0xFFFF, int(sweep_ms) & 0xFFFF,
+                        int(freqs[0]), step, n)
+    body = b"".join(_delta_encode(c) for c in (avg, mn, mx, hold))
+    data = head + body
+    return data + _CRC.pack(binascii.crc_hqx(data, 0xFFFF))
+
+def encode_line(freqs, avg, mn, mx, hold, scanint_ms=0, sweep_ms=0) -> str:
+    """Binary frame as base64 text line (without newline)."""
+    frame = encode_frame(freqs, avg, mn, mx, hold, scanint_ms, sweep_ms)
+    return BIN_PREFIX + base64.b64encode(frame).decode("ascii")
+
+
+# -------------------------------------------------------------
+# Decoding
+# -------------------------------------------------------------
+def decode_header(frame: bytes):
+    """
+    Checks length, magic, version and checksum of a binary frame.
+    Returns (scanint_ms, sweep_ms, f0, step, n). Raises FrameError.
+    """
+    if len(frame) < _HEADER.size + _CRC.size:
+        raise FrameError("frame too short")
+    magic, ver, ncol, scanint_ms, sweep_ms, f0, step, n = _HEADER.unpack_from(frame)
+    if magic != BIN_MAGIC:
+        raise FrameError("bad magic")
+    if ver != BIN_VERSION or ncol != len(COLUMNS):
+        raise FrameError(f"unsupported frame version {ver}/{ncol}")
+    end = _HEADER.size + ncol * n
+    if len(frame) != end + _CRC.size or n == 0:
+        raise FrameError("frame length mismatch")
+    (crc,) = _CRC.unpack_from(frame, end)
+    if crc != binascii.crc_hqx(memoryview(frame)[:end], 0xFFFF):
+        raise FrameError("checksum mismatch")
+    if step == 0:
+        raise FrameError("freq step 0")
+    return scanint_ms, sweep_ms, f0, step, n
+
+def decode_columns(frame: bytes, n: int, out=None) -> np.ndarray:
+    """
+    Undoes the delta encoding of a checked frame.
+    Returns int16 array (4, n) avg/min/max/hold; written into out if given
+    (may be a non-contiguous view, e.g. ScanFrame.cols).
+    """
+    ncol = len(COLUMNS)
+    delta = np.frombuffer(frame, dtype=np.int8, count=ncol * n, offset=_HEADER.size)
+    return np.cumsum(delta.reshape(ncol, n), axis=1, dtype=np.int16, out=out)
+
+def decode_frame(frame: bytes):
+    """
+    Decodes a binary frame.
+    Returns (scanint_ms, sweep_ms, freqs, cols) with cols as int16 array of
+    shape (4, n) in the order avg/min/max/hold. Raises FrameError.
+    """
+    scanint_ms, sweep_ms, f0, step, n = decode_header(frame)
+    cols = decode_columns(frame, n)
+    freqs = f0 + step * np.arange(n, dtype=np.int32)
+    return scanint_ms, sweep_ms, freqs, cols
+
+def line_to_frame(line: str) -> bytes:
+    """Raw frame bytes of a '~<base64>' line. Raises FrameError."""
+    if not line.startswith(BIN_PREFIX):
+        raise FrameError("no binary frame prefix")
+    try:
+        return base64.b64decode(line[len(BIN_PREFIX):], validate=True)
+    except (binascii.Error, ValueError) as e:
+        raise FrameError(f"base64: {e}")
+
+def decode_line(line: str):
+    """Decodes a '~<base64>' line, see decode_frame(). Raises FrameError."""
+    return decode_frame(line_to_frame(line))
+
+def is_binary_line(line: str) -> bool:
+    return line.startswith(BIN_PREFIX)
+
+
+# -------------------------------------------------------------
+# Log conversion JSON <-> binary
+# -------------------------------------------------------------
+def json_to_line(line: str):
+    """Converts a JSON scan line into a binary line, None if not a scan."""
+    try:
+        obj = json.loads(line)
+        c = np.asarray(obj["c"], dtype=np.int16)
+        if c.ndim != 2 or c.shape[1] < 5:
+            return None
+        return encode_line(c[:, 0], c[:, 1], c[:, 2], c[:, 3], c[:, 4],
+                           obj.get("scanint_ms", 0), obj.get("sweep_ms", 0))
+    except (ValueError, KeyError, TypeError):
+        return None
+
+def line_to_json(line: str):
+    """Converts a binary line into the JSON format of the device."""
+    scanint_ms, sweep_ms, freqs, cols = decode_line(line)
+    c = np.vstack((freqs, cols)).T.tolist()
+    obj = {"scanint_ms": scanint_ms, "sweep_ms": sweep_ms,
+           "legend": ["freq"] + list(COLUMNS), "c": c}
+    return json.dumps(obj, separators=(",", ":"))
+
+def convert_file(path_in, path_out, to_binary=True):
+    """Converts a scan log file, returns (lines written, bytes in, bytes out)."""
+    n = 0
+    size_in = 0
+    size_out = 0
+    with open(path_in, "r", encoding="utf-8") as fi, open(path_out, "w", encoding="utf-8") as fo:
+        for line in fi:
+            line = line.strip()
+            if not line:
+                continue
+            size_in += len(line) + 1
+            try:
+                out = json_to_line(line) if to_binary else line_to_json(line)
+            except FrameError as e:
+                print(f"skip invalid frame: {e}", file=sys.stderr)
+                continue
+            if out is None:
+                continue
+            fo.write(out + "\n")
+            size_out += len(out) + 1
+            n += 1
+    return n, size_in, size_out
+
+def bench_file(path, repeat=3):
+    """Compares decode time per frame of JSON lines vs. their binary lines."""
+    with open(path, "r", encoding="utf-8") as f:
+        lines_json = [l.strip() for l in f if l.strip()]
+    lines_bin = [b for b in map(json_to_line, lines_json) if b is not None]
+
+    def run(fn, lines):
+        best = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            for l in lines:
+                fn(l)
+            dt = (time.perf_counter() - t0) / max(1, len(lines))
+            best = dt if best is None else min(best, dt)
+        return best
+
+    def parse_json(l):
+        c = json.loads(l)["c"]
+        return np.asarray(c, dtype=np.int16)
+
+    t_json = run(parse_json, lines_json)
+    t_bin  = run(decode_line, lines_bin)
+    size_json = sum(map(len, lines_json)) / max(1, len(lines_json))
+    size_bin  = sum(map(len, lines_bin)) / max(1, len(lines_bin))
+    print(f"json: {size_json:7.0f} bytes/frame {t_json*1e6:8.1f} us/frame")
+    print(f"bin:  {size_bin:7.0f} bytes/frame {t_bin*1e6:8.1f} us/frame")
+
+
+if __name__ == "__main__":
+    # e.g. 'python -m lib.binframe scan_json.log scan_bin.log' or 'python -m lib.binframe --bench scan_json.log'
+    parser = argparse.ArgumentParser(description="convert scan logs between JSON and binary (base64) lines")
+    parser.add_argument("infile")
+    parser.add_argument("outfile", nargs="?")
+    parser.add_argument("--to-json", action="store_true", help="convert binary lines back to JSON")
+    parser.add_argument("--bench", action="store_true", help="only benchmark decoding of JSON infile")
+    args = parser.parse_args()
+
+    if args.bench or not args.outfile:
+        bench_file(args.infile)
+        sys.exit(0)
+    n, size_in, size_out = convert_file(args.infile, args.outfile, to_binary=not args.to_json)
+    print(f"{n} frames, {size_in} -> {size_out} bytes")
@@ -0,0 +1,194 @@
+# helper lib for mask-triggered event capture
+#
+# EventCapture keeps the last scans in a preallocated ring buffer (pre-trigger
+# history). Every scan is compared against a frequency/level mask in one
+# vectorized comparison; when the mask is violated, the pre-trigger history
+# plus a post-trigger window is written to a separate log file (JSON lines in
+# the device format, replayable with '--infile'). After a save the trigger
+# re-arms only when a scan passes the mask again, so a lasting violation gives
+# one file; scans already saved are not repeated in the next file.
+# The ring grows when scans arrive faster than MIN_INTERVAL (it would else
+# overwrite pre-trigger history); close() writes an open trigger and waits
+# for the writer threads.
+#
+# Mask syntax: "<f1>-<f2>:<dBm>[,<f1>-<f2>:<dBm>...]", e.g. "2400-2420:-60,2430-2480:-50"
+# (a channel violates the mask if its value is above the level). A mask file
+# contains the same segments, one or more per line, '#' starts a comment.
+
+import os
+import re
+import sys
+import json
+import datetime
+import threading
+
+import numpy as np
+
+PRETRIG_S     = 10.0        # seconds of history before the trigger
+POSTTRIG_S    = 5.0         # seconds recorded after the trigger
+MIN_INTERVAL  = 0.25        # expected fastest scan interval in s, initial ring size (grows if faster)
+MAX_CHANNELS  = 256
+
+LEGEND = ["freq", "avg", "min", "max", "hold"]
+SOURCES = {"avg": 1, "min": 2, "max": 3, "hold": 4}
+
+_SEGMENT = re.compile(r"\s*(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)\s*:\s*(-?\d+(?:\.\d+)?)\s*")
+
+
+def parse_mask(spec: str):
+    """Mask string or file -> list of (f1, f2, level). Raises ValueError."""
+    if os.path.isfile(spec):
+        with open(spec, "r", encoding="utf-8") as f:
+            spec = ",".join(line.split("#", 1)[0] for line in f)
+    segments = []
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        m = _SEGMENT.fullmatch(part)
+        if not m:
+            raise ValueError(f"invalid mask segment '{part.strip()}' (use: <f1>-<f2>:<dBm>)")
+        f1, f2, level = float(m.group(1)), float(m.group(2)), float(m.group(3))
+        segments.append((min(f1, f2), max(f1, f2), level))
+    if not segments:
+        raise ValueError("empty mask")
+    return segments
+
+def mask_limits(segments, freqs: np.ndarray) -> np.ndarray:
+    """Per-channel limit in dBm; +inf where no segment applies (lowest level wins)."""
+    limit = np.full(freqs.size, np.inf, dtype=np.float32)
+    for f1, f2, level in segments:
+        sel = (freqs >= f1) & (freqs <= f2)
+        np.minimum(limit, level, out=limit, where=sel)
+    return limit
+
+
+class EventCapture:
+    """Pre-trigger ring buffer with mask trigger, one instance per device."""
+
+    def __init__(self, segments, pre_s=PRETRIG_S, post_s=POSTTRIG_S, source="max",
+                 prefix="capture", min_interval=MIN_INTERVAL, max_channels=MAX_CHANNELS):
+        self.segments = segments
+        self.pre_s    = pre_s
+        self.post_s   = post_s
+        self.col      = SOURCES[source]
+        self.prefix   = prefix
+        self.size     = int(np.ceil((pre_s + post_s) / min_interval)) + 2
+        self._head    = 0               # next slot
+        self._count   = 0               # valid slots
+        self._resize(self.size, max_channels)
+        self._limit   = None
+        self._range   = None            # (f0, flast, n) of the cached limit
+        self._cmp     = None
+        self.trig_t   = None            # time of the active trigger
+        self.armed    = True            # False after a save until the mask passes again
+        self.saved_t  = -np.inf         # time of the last saved scan
+        self.events   = 0
+        self._writers = []
+
+    def _resize(self, size, channels):
+        """(Re)allocates the ring, keeps the stored scans in chronological order."""
+        slots = (self._head - self._count + np.arange(self._count)) % self.size
+        block = np.zeros((size, channels, 5), dtype=np.int16)
+        nn    = np.zeros(size, dtype=np.int32)
+        t     = np.zeros(size, dtype=np.float64)
+        meta  = np.zeros((size, 2), dtype=np.int32)                # scanint_ms, sweep_ms
+        if self._count:
+            k = self._count
+            block[:k, :self.block.shape[1]] = self.block[slots]
+            nn[:k], t[:k], meta[:k] = self.n[slots], self.t[slots], self.meta[slots]
+        self.block, self.n, self.t, self.meta = block, nn, t, meta
+        self.size  = size
+        self._head = self._count % size
+
+    def feed(self, frame):
+        """
+        Stores a scan (ScanFrame) and evaluates the mask.
+        Returns a message for the console on trigger/save, else None.
+        """
+        n = frame.n
+        if n > self.block.shape[1]:
+            self._resize(self.size, n)
+        # Ring voll und ältester Scan noch im Pre+Post-Fenster: Scans kommen schneller als erwartet
+        if self._count == self.size and self.t[self._head] >= frame.t - (self.pre_s + self.post_s):
+            self._resize(2 * self.size, self.block.shape[1])
+        # in den Ring kopieren
+        h = self._head
+        self.block[h, :n] = frame.data
+        self.n[h] = n
+        self.t[h] = frame.t
+        self.meta[h] = (frame.scanint_ms, frame.sweep_ms)
+        self._head = (h + 1) % self.size
+        self._count = min(self._count + 1, self.size)
+
+        # Post-Trigger-Fenster läuft
+        if self.trig_t is not None:
+            if frame.t - self.trig_t >= self.post_s:
+                return self._save()
+            return None
+
+        i = self._violation(frame)
+        if not self.armed:
+            # erst wieder scharf, wenn die Maske eingehalten wird
+            self.armed = i < 0
+            return None
+        if i >= 0:
+            self.trig_t = frame.t
+            return (f"capture trigger @ {frame.freqs[i]} MHz: "
+                    f"{frame.data[i, self.col]} dBm > {self._limit[i]:.0f} dBm")
+        return None
+
+    def _violation(self, frame) -> int:
+        """Index of the first channel above the mask, -1 if the scan passes."""
+        # Grenzwerte nur bei neuem Frequenzbereich neu berechnen
+        freqs = frame.freqs
+        n = frame.n
+        rng = (int(freqs[0]), int(freqs[-1]), n)
+        if rng != self._range:
+            self._range = rng
+            self._limit = mask_limits(self.segments, freqs)
+            self._cmp = np.empty(n, dtype=bool)
+        if frame.fresh is None:
+            np.greater(frame.data[:, self.col], self._limit, out=self._cmp)
+        else:
+            # nur gemessene Kanäle prüfen (adaptive Sweep: Rest sind alte Werte)
+            self._cmp[:] = False
+            np.greater(frame.data[frame.fresh, self.col], self._limit[frame.fresh], out=self._cmp[frame.fresh])
+        return int(self._cmp.argmax()) if self._cmp.any() else -1
+
+    def _save(self):
+        """Copies pre+post frames out of the ring and writes them in a background thread."""
+        slots = (self._head - self._count + np.arange(self._count)) % self.size
+        t = self.t[slots]
+        slots = slots[(t >= self.trig_t - self.pre_s) & (t > self.saved_t)]
+        frames = [(self.t[k], self.meta[k].copy(), self.block[k, :self.n[k]].copy()) for k in slots]
+        ts = datetime.datetime.fromtimestamp(self.trig_t).strftime("%Y-%m-%d_%H%M%S_%f")[:-3]     # ms
+        path = f"{self.prefix}_{ts}.log"
+        if len(slots):
+            self.saved_t = self.t[slots[-1]]
+        self.trig_t = None
+        self.armed = False
+        self.events += 1
+        w = threading.Thread(target=write_frames, args=(path, frames), daemon=True)
+        w.start()
+        self._writers = [x for x in self._writers if x.is_alive()] + [w]
+        return f"capture saved: {path} ({len(frames)} scans)"
+
+    def close(self, timeout=10.0):
+        """On exit/end of replay: saves an open trigger (shortened post window), waits for the writers."""
+        msg = self._save() if self.trig_t is not None else None
+        for w in self._writers:
+            w.join(timeout)
+        self._writers = []
+        return msg
+
+
+def write_frames(path, frames):
+    """Writes (t, (scanint_ms, sweep_ms), data) frames as JSON lines."""
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            for t, meta, data in frames:
+                obj = {"scanint_ms": int(meta[0]), "sweep_ms": int(meta[1]), "t": round(float(t), 3),
+                       "legend": LEGEND, "c": data.tolist()}
+                f.write(json.dumps(obj, separators=(",", ":")) + "\n")
+    except Exception as e:
+        print(f"Capture write error: {e}", file=sys.stderr)
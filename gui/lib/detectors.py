@@ -0,0 +1,181 @@
+# helper lib for host-side trace detectors
+#
+# Every detector processes one column of each scan (avg/min/max/hold) and
+# keeps its result in a preallocated float32 array that is updated in place:
+#   maxhold:<N>   max. of the last N scans per channel
+#   minhold:<N>   min. of the last N scans per channel
+#   ema:<alpha>   exponential average, out += alpha * (x - out)
+#   decay:<dB>    peak hold that falls by <dB> per scan
+# With 'fresh' (slice of the channels measured in a scan, e.g. while the
+# adaptive scheduler dwells on a sub-band) only those channels are updated;
+# the other channels keep their result instead of taking repeated values.
+#
+# The windowed max/min uses the van Herk/Gil-Werman block decomposition: the
+# window of the last N scans is the max of a suffix aggregate of the previous
+# block and a running prefix aggregate of the current block. The suffix
+# aggregate is recomputed once per N scans, so each scan costs O(1) amortized
+# per channel, vectorized over all channels (same bound as a monotonic deque).
+#
+# Trace spec (command line): "<name>=<kind>:<param>[:<source>]",
+# e.g. "max20=maxhold:20", "ema=ema:0.2:avg".
+
+import numpy as np
+
+DEFAULT_SOURCE = {"maxhold": "max", "minhold": "min", "ema": "avg", "decay": "max"}
+SOURCES = ("avg", "min", "max", "hold")
+
+
+class WindowHold:
+    """Rolling max (or min) of the last N scans per channel."""
+
+    def __init__(self, n: int, mode="max"):
+        if n < 1:
+            raise ValueError("window must be >= 1 scan")
+        self.win  = int(n)
+        self.ufunc = np.maximum if mode == "max" else np.minimum
+        self.init = -np.inf if mode == "max" else np.inf
+        self.out  = None
+        self._channels = -1
+
+    def _alloc(self, channels):
+        self._channels = channels
+        self._buf = np.full((self.win, channels), self.init, dtype=np.float32)   # aktueller Block
+        self._suf = np.full((self.win, channels), self.init, dtype=np.float32)   # Suffix-Aggregat Vorgängerblock
+        self._pre = np.full(channels, self.init, dtype=np.float32)               # Präfix-Aggregat aktueller Block
+        self.out  = np.empty(channels, dtype=np.float32)
+        self._in  = np.empty(channels, dtype=np.float32)                        # Scan mit neutralen Werten
+        self._k   = 0
+
+    def reset(self):
+        self._channels = -1
+
+    def update(self, x: np.ndarray, fresh=None) -> np.ndarray:
+        if x.size != self._channels:
+            self._alloc(x.size)
+        if fresh is not None:
+            # nicht gemessene Kanäle: neutraler Wert, altern aber mit
+            self._in[:] = self.init
+            self._in[fresh] = x[fresh]
+            x = self._in
+            prev = self.out.copy()
+        pos = self._k % self.win
+        if pos == 0:
+            # Block voll: Suffix-Aggregat (von hinten akkumuliert) einmal pro N Scans
+            if self._k:
+                self.ufunc.accumulate(self._buf[::-1], axis=0, out=self._suf[::-1])
+            self._pre[:] = x
+        else:
+            self.ufunc(self._pre, x, out=self._pre)
+        self._buf[pos] = x
+        self._k += 1
+
+        if pos == self.win - 1:
+            self.out[:] = self._pre
+        else:
+            self.ufunc(self._suf[pos + 1], self._pre, out=self.out)
+        if fresh is not None and self._k > 1:
+            # Fenster ohne Messung: letzten Wert halten
+            np.copyto(self.out, prev, where=np.isinf(self.out))
+        return self.out
+
+
+class Ema:
+    """Exponential moving average with factor alpha (0..1)."""
+
+    def __init__(self, alpha: float):
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = float(alpha)
+        self.out = None
+
+    def reset(self):
+        self.out = None
+
+    def update(self, x: np.ndarray, fresh=None) -> np.ndarray:
+        if self.out is None or self.out.size != x.size:
+            self.out = np.array(x, dtype=np.float32)
+            self._tmp = np.empty_like(self.out)
+            return self.out
+        sl = slice(None) if fresh is None else fresh
+        out, tmp = self.out[sl], self._tmp[sl]
+        np.subtract(x[sl], out, out=tmp)
+        tmp *= self.alpha
+        out += tmp
+        return self.out
+
+
+class DecayHold:
+    """Peak hold that decays by 'decay' dB per scan."""
+
+    def __init__(self, decay: float):
+        self.decay = float(decay)
+        self.out = None
+
+    def reset(self):
+        self.out = None
+
+    def update(self, x: np.ndarray, fresh=None) -> np.ndarray:
+        if self.out is None or self.out.size != x.size:
+            self.out = np.array(x, dtype=np.float32)
+            return self.out
+        sl = slice(None) if fresh is None else fresh
+        out = self.out[sl]
+        out -= self.decay
+        np.maximum(out, x[sl], out=out)
+        return self.out
+
+
+def make_detector(kind: str, param: str):
+    if kind == "maxhold":
+        return WindowHold(int(param), "max")
+    if kind == "minhold":
+        return WindowHold(int(param), "min")
+    if kind == "ema":
+        return Ema(float(param))
+    if kind == "decay":
+        return DecayHold(float(param))
+    raise ValueError(f"unknown detector '{kind}' (maxhold, minhold, ema, decay)")
+
+
+def parse_trace(spec: str):
+    """'<name>=<kind>:<param>[:<source>]' -> (name, source, detector). Raises ValueError."""
+    try:
+        name, rest = spec.split("=", 1)
+        parts = rest.split(":")
+        kind, param = parts[0].strip(), parts[1].strip()
+        source = parts[2].strip() if len(parts) > 2 else DEFAULT_SOURCE.get(kind, "max")
+    except (ValueError, IndexError):
+        raise ValueError(f"invalid trace '{spec}' (use: <name>=<kind>:<param>[:<source>])")
+    name = name.strip()
+    if not name or name in SOURCES:
+        raise ValueError(f"invalid trace name '{name}'")
+    if source not in SOURCES:
+        raise ValueError(f"invalid trace source '{source}' ({', '.join(SOURCES)})")
+    return name, source, make_detector(kind, param)
+
+
+class TraceBank:
+    """All host-side traces; updated once per scan, results by trace name."""
+
+    def __init__(self):
+        self.traces = {}                    # name -> (source, detector)
+
+    def add(self, name, source, detector):
+        self.traces[name] = (source, detector)
+
+    def names(self):
+        return list(self.traces)
+
+    def reset(self):
+        for _, det in self.traces.values():
+            det.reset()
+
+    def update(self, frame):
+        for source, det in self.traces.values():
+            det.update(getattr(frame, source), frame.fresh)
+
+    def values(self, name, frame=None):
+        """Result of a trace, or the device column 'name' of frame."""
+        if name in self.traces:
+            return self.traces[name][1].out
+        return getattr(frame, name)
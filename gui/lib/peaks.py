@@ -0,0 +1,219 @@
+# helper lib for peak detection and cross-scan signal tracking
+#
+# find_peaks() works vectorized on one spectrum (max or avg values in dBm),
+# PeakTracker links the peaks of consecutive scans to tracks (= emitters).
+
+import time
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Default parameters (dBm, bins)
+PEAK_THRESHOLD  = -80       # min. level of a peak in dBm
+PEAK_PROMINENCE = 6         # min. height above the surrounding base in dB
+PEAK_WIDTH      = 1         # min. width at half prominence in bins
+PEAK_WLEN       = 40        # bins left/right of a peak to search for its base (> widest signal, 20 MHz WiFi)
+
+TRACK_MAX_DF    = 3.0       # max. freq. jump in MHz between scans to continue a track
+TRACK_MAX_GAP   = 3         # scans without detection until a track is closed
+TRACK_HISTORY   = 500       # closed tracks kept in history
+
+
+# -------------------------------------------------------------
+# Peak-Erkennung (vektorisiert)
+# -------------------------------------------------------------
+def find_peaks(vals: np.ndarray, threshold=PEAK_THRESHOLD, prominence=PEAK_PROMINENCE,
+               width=PEAK_WIDTH, wlen=PEAK_WLEN):
+    """
+    Findet lokale Maxima in vals.
+    Returns (idx, prom, wid): bin index, prominence in dB and width in bins
+    at half prominence of every peak that passes threshold/prominence/width.
+    Like scipy.signal.find_peaks/peak_prominences: the base on each side is
+    the minimum up to the first higher sample (or wlen bins, or the edge);
+    a flat top counts as one peak at its midpoint. Everything is done with a
+    few array ops over +-wlen windows.
+    """
+    x = np.asarray(vals, dtype=np.float32)
+    n = x.size
+    empty = (np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.intp))
+    if n < 3:
+        return empty
+
+    # lokale Maxima inkl. Plateaus: steigende Flanke bei p, Plateau bis q, danach fallend
+    p = np.flatnonzero(x[1:] > x[:-1]) + 1
+    change = np.flatnonzero(x[1:] != x[:-1])               # letzter Index jedes Laufs gleicher Werte
+    j = np.searchsorted(change, p)
+    q = np.where(j < change.size, change[np.minimum(j, change.size - 1)], n - 1)
+    ok = (q < n - 1) & (x[p] >= threshold)
+    p, q = p[ok], q[ok]
+    ok = x[q + 1] < x[p]
+    p, q = p[ok], q[ok]
+    if p.size == 0:
+        return empty
+    peak = x[p][:, None]
+
+    # Fenster links ab linker Plateaukante, rechts ab rechter (padded: Rand = +inf = Stopp)
+    pad = np.pad(x, wlen, mode="constant", constant_values=np.inf)
+    win = sliding_window_view(pad, wlen + 1)
+    left  = win[p][:, ::-1]                 # x[p], x[p-1] .. x[p-wlen]
+    right = win[q + wlen]                   # x[q] .. x[q+wlen]
+
+    # Basis je Seite: Minimum bis zum ersten höheren Wert
+    def side_base(w):
+        higher = w > peak
+        stop = np.where(higher.any(axis=1), higher.argmax(axis=1), wlen + 1)
+        inside = np.arange(wlen + 1)[None, :] < stop[:, None]
+        return np.where(inside, w, np.inf).min(axis=1)
+
+    prom = x[p] - np.maximum(side_base(left), side_base(right))
+
+    # Breite bei halber Prominenz: zusammenhängende Bins über dem Level
+    level = (x[p] - prom / 2)[:, None]
+    below_l = left < level
+    below_r = right < level
+    n_l = np.where(below_l.any(axis=1), below_l.argmax(axis=1), wlen + 1)
+    n_r = np.where(below_r.any(axis=1), below_r.argmax(axis=1), wlen + 1)
+    wid = (q - p) + n_l + n_r - 1
+
+    keep = (prom >= prominence) & (wid >= width)
+    idx = (p + q) // 2
+    return idx[keep], prom[keep], wid[keep]
+
+
+# -------------------------------------------------------------
+# Tracking über mehrere Scans
+# -------------------------------------------------------------
+class Track:
+    """Ein über mehrere Scans verfolgtes Signal."""
+    __slots__ = ("id", "t_start", "t_end", "f_center", "p_max", "p_sum", "hits", "missed")
+
+    def __init__(self, tid, t, f, p):
+        self.id       = tid
+        self.t_start  = t
+        self.t_end    = t
+        self.f_center = float(f)
+        self.p_max    = float(p)
+        self.p_sum    = float(p)
+        self.hits     = 1
+        self.missed   = 0
+
+    @property
+    def p_mean(self):
+        return self.p_sum / self.hits
+
+    def update(self, t, f, p):
+        self.hits += 1
+        self.t_end = t
+        self.f_center += (f - self.f_center) / self.hits      # laufender Mittelwert
+        self.p_max = max(self.p_max, float(p))
+        self.p_sum += float(p)
+        self.missed = 0
+
+    def __repr__(self):
+        return (f"T{self.id}: {self.f_center:.1f} MHz, {self.t_end - self.t_start:.1f} s, "
+                f"max {self.p_max:.0f} dBm, mean {self.p_mean:.1f} dBm, {self.hits} scans")
+
+
+class PeakTracker:
+    """
+    Verknüpft Peaks aufeinanderfolgender Scans zu Tracks.
+    Active tracks are matched greedily by smallest frequency distance
+    (<= max_df, or half the peak width for wide signals). Tracks missing for more than max_gap scans are closed and
+    moved to a bounded history.
+    """
+
+    def __init__(self, max_df=TRACK_MAX_DF, max_gap=TRACK_MAX_GAP, history=TRACK_HISTORY,
+                 threshold=PEAK_THRESHOLD, prominence=PEAK_PROMINENCE, width=PEAK_WIDTH, wlen=PEAK_WLEN):
+        self.max_df     = max_df
+        self.max_gap    = max_gap
+        self.threshold  = threshold
+        self.prominence = prominence
+        self.width      = width
+        self.wlen       = wlen
+        self.active     = []
+        self.history    = deque(maxlen=history)
+        self._next_id   = 1
+
+    def reset(self):
+        for tr in self.active:
+            self.history.append(tr)
+        self.active = []
+
+    def update(self, freqs: np.ndarray, vals: np.ndarray, t=None, fresh=None):
+        """
+        Verarbeitet einen Scan, liefert die aktiven Tracks, die in diesem Scan gesehen wurden.
+        fresh: slice of the measured channels (adaptive sweep), tracks outside do not age.
+        """
+        if t is None:
+            t = time.time()
+        if fresh is not None:
+            freqs, vals = freqs[fresh], vals[fresh]
+        idx, prom, wid = find_peaks(vals, self.threshold, self.prominence, self.width, self.wlen)
+        pf = np.asarray(freqs, dtype=np.float32)[idx]
+        pp = np.asarray(vals, dtype=np.float32)[idx]
+
+        matched_peak = np.zeros(idx.size, dtype=bool)
+        seen = []
+        if self.active and idx.size:
+            tf = np.fromiter((tr.f_center for tr in self.active), dtype=np.float32, count=len(self.active))
+            dist = np.abs(tf[:, None] - pf[None, :])
+            # breite Signale: Maximum darf innerhalb der halben Breite springen
+            step = abs(float(freqs[1]) - float(freqs[0])) if len(freqs) > 1 else 1.0
+            dist[dist > np.maximum(self.max_df, wid * step / 2)[None, :]] = np.inf
+            # greedy: kleinste Abstände zuerst
+            order = np.argsort(dist, axis=None)
+            used_track = np.zeros(tf.size, dtype=bool)
+            for k in order[:np.count_nonzero(np.isfinite(dist))]:
+                i, j = divmod(int(k), pf.size)
+                if used_track[i] or matched_peak[j]:
+                    continue
+                used_track[i] = True
+                matched_peak[j] = True
+                self.active[i].update(t, pf[j], pp[j])
+                seen.append(self.active[i])
+
+        # nicht gesehene Tracks altern lassen / schließen
+        still = []
+        f_lo, f_hi = (float(freqs[0]), float(freqs[-1])) if len(freqs) else (0.0, -1.0)
+        for tr in self.active:
+            if tr.t_end != t and f_lo <= tr.f_center <= f_hi:
+                tr.missed += 1
+                if tr.missed > self.max_gap:
+                    self.history.append(tr)
+                    continue
+            still.append(tr)
+        self.active = still
+
+        # neue Tracks für nicht zugeordnete Peaks
+        for j in np.flatnonzero(~matched_peak):
+            tr = Track(self._next_id, t, pf[j], pp[j])
+            self._next_id += 1
+            self.active.append(tr)
+            seen.append(tr)
+        return seen
+
+
+if __name__ == "__main__":
+    # quick benchmark: 'python -m lib.peaks', checks that both planted signals are found once
+    rng = np.random.default_rng(0)
+    n_bins = 4000
+    freqs = np.arange(n_bins, dtype=np.int32)
+    tracker = PeakTracker()
+    n = 200
+    scans = rng.normal(-95, 2, (n, n_bins)).astype(np.float32)
+    scans[:, 500:520] = rng.normal(-50, 1, (n, 20))                  # breites Signal, verrauschtes Dach
+    scans[np.arange(n), 2000 + np.arange(n) % 5] = -40                # schmales, springendes Signal
+    t0 = time.perf_counter()
+    for i in range(n):
+        tracker.update(freqs, scans[i], t=i * 0.25)
+    dt = (time.perf_counter() - t0) / n
+    print(f"{n_bins} bins: {dt * 1e3:.2f} ms/scan, {len(tracker.active)} active, {len(tracker.history)} closed tracks")
+    for i in range(n):
+        idx, prom, wid = find_peaks(scans[i])
+        assert np.count_nonzero((idx >= 500) & (idx < 520)) == 1, f"scan {i}: wide signal {idx}"
+        assert 2000 + i % 5 in idx, f"scan {i}: narrow signal {idx}"
+    flat = np.full(n_bins, -95, dtype=np.float32)
+    flat[1000:1100] = -50                                             # Plateau breiter als 2*wlen
+    assert list(find_peaks(flat)[0]) == [1049]
+    print("planted signals found")
@@ -0,0 +1,203 @@
+# helper lib for protocol classification of 2.4 GHz activity
+#
+# The classifier keeps a sliding window of the last WINDOW scans (max values)
+# and matches it against per-protocol channel templates with a few batched
+# array operations per scan:
+#   1. activity map A (rows x channels): value > noise floor of the row + ACT_DB,
+#      occupancy per bin = share of the window rows in which the bin is active
+#   2. WiFi from the 2-D template: a swept scanner sees a WiFi channel only as a
+#      few scattered bins per sweep, but over the window its whole 20 MHz band
+#      is occupied; bins of a detected WiFi channel (and rows with a contiguous
+#      wide signal) are removed from the narrow activity
+#   3. template matrices (channels of a protocol x bins) are correlated with
+#      the narrow map of all rows at once (one matmul per protocol)
+#   4. per protocol a confidence 0..1 is derived:
+#        WiFi:   share of the bins of a 20 MHz channel occupied in the window
+#        BLE:    advertising channels + narrow hits hopping over many 2 MHz data
+#                channels (bins with steady activity are no hops)
+#        ZigBee: narrow 2..3 MHz wide signal persistent on a 5 MHz spaced 802.15.4
+#                channel; hits on BLE/nRF24 channels count less if those are detected
+#        nRF24:  narrow hits hopping on the Hoymiles nRF24 channel set
+
+import time
+from collections import deque
+
+import numpy as np
+
+WINDOW        = 20          # scans in the sliding window
+HISTORY       = 2000        # (t, confidences) kept for the timeline
+ACT_DB        = 10          # dB above the noise floor of a scan = active
+FLOOR_PCT     = 25          # percentile of a scan used as noise floor
+WIDE_MHZ      = 15          # min. contiguous active width of a wide signal in one scan
+WIDE_FILL     = 0.8         # min. active share within WIDE_MHZ
+WIFI_HALF_MHZ = 8           # occupied half bandwidth of a 20 MHz WiFi channel
+WIFI_OCC      = 0.05        # min. occupancy of a bin in the window (WiFi)
+WIFI_FILL     = (0.55, 0.8) # share of occupied channel bins for confidence 0 .. 1
+BLE_HOPS      = 8           # distinct BLE data channels in the window for full confidence
+HOP_OCC       = 0.3         # bins (+-2 MHz) occupied more than this are steady, no hops
+NRF_HOPS      = 3           # distinct nRF24 channels in the window for full confidence
+ZB_PERSIST    = 0.8         # share of scans a ZigBee channel is active for full confidence
+MIN_ROWS      = WINDOW // 2 # scans in the window before WiFi/ZigBee are reported
+
+# channel centers in MHz
+WIFI_CENTERS   = [2412 + 5 * (ch - 1) for ch in range(1, 14)]
+BLE_CENTERS    = [2402 + 2 * k for k in range(40)]
+BLE_ADV        = [2402, 2426, 2480]
+ZIGBEE_CENTERS = [2405 + 5 * (ch - 11) for ch in range(11, 27)]
+NRF24_CENTERS  = [2403, 2423, 2440, 2461, 2475]          # Hoymiles
+
+PROTOCOLS = ("wifi", "ble", "zigbee", "nrf24")
+
+
+def _box(a: np.ndarray, w: int) -> np.ndarray:
+    """Sum over w bins (centered) along axis 1 for all rows, via cumsum."""
+    rows, n = a.shape
+    h = w // 2
+    p = np.zeros((rows, n + w), dtype=np.float32)
+    p[:, h + 1:h + 1 + n] = a
+    cs = np.cumsum(p, axis=1)
+    return cs[:, w:w + n] - cs[:, :n]
+
+def _template(freqs: np.ndarray, centers, half_width=0) -> np.ndarray:
+    """(len(centers) x channels) 0/1 matrix, bins within +-half_width MHz of a center."""
+    f = np.asarray(freqs, dtype=np.float32)
+    c = np.asarray(centers, dtype=np.float32)[:, None]
+    return (np.abs(f[None, :] - c) <= half_width).astype(np.float32)
+
+
+class ProtocolClassifier:
+    """Per-protocol confidence from a sliding window of scans."""
+
+    def __init__(self, window=WINDOW, history=HISTORY):
+        self.window  = window
+        self.history = deque(maxlen=history)         # (t, {protocol: confidence})
+        self.conf    = dict.fromkeys(PROTOCOLS, 0.0)
+        self.wifi_ch = None                          # best WiFi channel center
+        self.zb_ch   = None                          # best ZigBee channel center
+        self._range  = None
+
+    def reset(self):
+        self._range = None
+
+    def _setup(self, freqs):
+        n = freqs.size
+        self._range = (int(freqs[0]), n)
+        self._buf = np.zeros((2 * self.window, n), dtype=np.float32)     # Doppel-Ring
+        self._pos = self.window - 1
+        self._rows = 0
+        self.t_wifi = _template(freqs, WIFI_CENTERS, WIFI_HALF_MHZ)
+        self.t_ble  = _template(freqs, [c for c in BLE_CENTERS if c not in BLE_ADV])
+        self.t_adv  = _template(freqs, BLE_ADV)
+        self.t_zb   = _template(freqs, ZIGBEE_CENTERS)
+        self.t_zb_side = _template(freqs, ZIGBEE_CENTERS, 1) - self.t_zb     # Nachbarkanäle +-1
+        self.t_zb_wide = _template(freqs, ZIGBEE_CENTERS, 3)                  # +-3, max. 3 davon aktiv
+        self.t_nrf  = _template(freqs, NRF24_CENTERS)
+        self.wifi_centers = np.asarray(WIFI_CENTERS)
+        self.zb_centers   = np.asarray(ZIGBEE_CENTERS)
+        self.zb_on_ble    = np.isin(self.zb_centers, BLE_CENTERS).astype(np.float32)
+        self.zb_on_nrf    = np.isin(self.zb_centers, NRF24_CENTERS).astype(np.float32)
+
+    def update(self, freqs: np.ndarray, vals: np.ndarray, t=None):
+        """Adds one scan and recomputes all confidences. Returns dict protocol -> 0..1."""
+        if t is None:
+            t = time.time()
+        if self._range != (int(freqs[0]), freqs.size):
+            self._setup(freqs)
+        pos = (self._pos + 1) % self.window
+        self._buf[pos] = vals
+        self._buf[pos + self.window] = vals
+        self._pos = pos
+        self._rows = min(self._rows + 1, self.window)
+        x = self._buf[pos + 1 + self.window - self._rows:pos + 1 + self.window]
+
+        self.conf = self.classify(x)
+        self.history.append((t, self.conf))
+        return self.conf
+
+    def classify(self, x: np.ndarray):
+        """Confidences for a window x (rows x channels, dBm)."""
+        rows, n = x.shape
+        # 1. Aktivität relativ zum Rauschboden jeder Zeile
+        floor = np.percentile(x, FLOOR_PCT, axis=1, keepdims=True)
+        act = (x > floor + ACT_DB).astype(np.float32)
+
+        occ = act.mean(axis=0)
+
+        # 2. WiFi: Belegung der Bins über das Fenster (2-D-Template), ganze Kanalbreite
+        fill = (occ >= WIFI_OCC).astype(np.float32) @ self.t_wifi.T / (2 * WIFI_HALF_MHZ + 1)
+        lo, hi = WIFI_FILL
+        conf_wifi = np.clip((fill - lo) / (hi - lo), 0.0, 1.0) if rows >= MIN_ROWS else np.zeros_like(fill)
+        flat = np.minimum(occ, 5 * WIFI_OCC) @ self.t_wifi.T            # begrenzt: schmaler Dauerträger zählt nicht mehr
+        k = int(np.lexsort((flat, fill))[-1])                           # max. Füllung, dann max. (flache) Belegung
+        conf = {"wifi": float(conf_wifi[k])}
+        self.wifi_ch = int(self.wifi_centers[k]) if conf["wifi"] > 0 else None
+
+        # schmal = aktiv, nicht in einem erkannten WiFi-Kanal und nicht Teil eines breiten Signals
+        w = min(WIDE_MHZ, n)
+        wide_c = (_box(act, w) >= WIDE_FILL * w).astype(np.float32)     # Zentren breiter Signale
+        wide = _box(wide_c, w) > 0
+        wide |= ((fill > lo).astype(np.float32) @ self.t_wifi > 0)[None, :]     # auch vor MIN_ROWS
+        narrow = act * ~wide
+
+        # 3. Korrelation aller Zeilen mit den Templates (je eine Matrixmultiplikation)
+        steady = (_box((occ > HOP_OCC)[None, :].astype(np.float32), 5) > 0)[0]   # Dauerträger +-2 MHz
+        hops = narrow * ~steady
+        hit_ble  = (hops @ self.t_ble.T) > 0                            # rows x 37
+        hit_adv  = (narrow @ self.t_adv.T) > 0                          # rows x 3
+        hit_zb   = (((narrow @ self.t_zb.T) > 0) & ((narrow @ self.t_zb_side.T) > 0)
+                    & ((act @ self.t_zb_wide.T) <= 3))                  # rows x 16, 2..3 MHz breit, frei daneben
+        hit_nrf  = (narrow @ self.t_nrf.T) > 0                          # rows x 5
+        n_narrow = narrow.sum()
+
+        # 4. Konfidenzen
+        # BLE: je zur Hälfte Advertising-Kanäle und Hopping über die Datenkanäle
+        distinct_ble = np.count_nonzero(hit_ble.any(axis=0))
+        distinct_adv = np.count_nonzero(hit_adv.any(axis=0))
+        conf["ble"] = 0.5 * min(1.0, distinct_ble / BLE_HOPS) + 0.5 * distinct_adv / len(BLE_ADV)
+
+        distinct_nrf = np.count_nonzero(hit_nrf.any(axis=0))
+        on_nrf = float((narrow @ self.t_nrf.T).sum() / n_narrow) if n_narrow else 0.0
+        conf["nrf24"] = min(1.0, distinct_nrf / NRF_HOPS) * min(1.0, 2.0 * on_nrf)
+
+        # ZigBee: Treffer auf BLE-/nRF24-Kanälen sind durch deren Hopping schon erklärt
+        occ_zb = hit_zb.mean(axis=0)
+        occ_zb *= ((occ >= WIFI_OCC) @ self.t_zb_wide.T) <= 3            # auch über das Fenster schmal
+        occ_zb *= 1.0 - conf["ble"] * self.zb_on_ble
+        occ_zb *= 1.0 - conf["nrf24"] * self.zb_on_nrf
+        k = int(occ_zb.argmax())
+        conf["zigbee"] = min(1.0, float(occ_zb[k]) / ZB_PERSIST) if rows >= MIN_ROWS else 0.0
+        self.zb_ch = int(self.zb_centers[k]) if conf["zigbee"] > 0 else None
+        return conf
+
+    def summary(self):
+        txt = []
+        for p in PROTOCOLS:
+            s = f"{p} {self.conf[p]:.2f}"
+            if p == "wifi" and self.wifi_ch:
+                s += f" ({self.wifi_ch})"
+            if p == "zigbee" and self.zb_ch:
+                s += f" ({self.zb_ch})"
+            txt.append(s)
+        return ", ".join(txt)
+
+
+if __name__ == "__main__":
+    # benchmark: 'python -m lib.protocols', several scanners at 0.25 s scan interval
+    rng = np.random.default_rng(0)
+    scanners = 4
+    interval = 0.25
+    for n_ch in (101, 1001):
+        freqs = np.arange(2400, 2400 + n_ch, dtype=np.int16)
+        clf = [ProtocolClassifier() for _ in range(scanners)]
+        n = 200
+        scans = rng.normal(-95, 2, (n, n_ch)).astype(np.float32)
+        wifi = 29 + rng.integers(0, 17, (n, 3))                # WiFi ch 6 (2437 MHz), swept: wenige Bins pro Scan
+        scans[np.arange(n)[:, None], wifi] = -50
+        scans[np.arange(n), 2 * rng.integers(1, 40, n) % n_ch] = -60     # BLE Hopping
+        t0 = time.perf_counter()
+        for i in range(n):
+            for c in clf:
+                c.update(freqs, scans[i], t=i * interval)
+        dt = (time.perf_counter() - t0) / n
+        print(f"{n_ch:5d} channels, {scanners} scanners: {dt * 1e3:6.2f} ms per scan interval "
+              f"({100 * dt / interval:4.1f} % of {interval} s), {clf[0].summary()}")
@@ -0,0 +1,105 @@
+# helper lib for pooled, preallocated scan frames
+#
+# A ScanFrame keeps all values of one scan in one contiguous int16 block of
+# shape (channels, 5) with the columns freq/avg/min/max/hold (same layout as
+# the "c" array of the JSON stream). The column attributes are views into
+# this block, so nothing is copied or converted between parser and GUI.
+# Frames are taken from a FramePool by the reader thread and given back by
+# the consumer, which avoids allocator/GC churn at high scan rates.
+
+import threading
+from collections import deque
+
+import numpy as np
+
+COLUMNS   = ("freqs", "avg", "min", "max", "hold")
+N_COLUMNS = len(COLUMNS)
+
+POOL_SIZE     = 16          # frames kept for reuse
+POOL_CHANNELS = 256         # initial channel capacity of a frame
+
+_ramp = np.arange(POOL_CHANNELS, dtype=np.int32)
+
+
+def _ramp_index(n: int) -> np.ndarray:
+    """Shared 0..n-1 index, grown on demand, so set_freq_ramp needs no temporary array."""
+    global _ramp
+    if n > _ramp.size:
+        _ramp = np.arange(max(n, 2 * _ramp.size), dtype=np.int32)
+    return _ramp[:n]
+
+
+class ScanFrame:
+    """One scan: int16 block (capacity x 5) plus column views of the first n channels."""
+    __slots__ = ("block", "n", "freqs", "avg", "min", "max", "hold", "freq_hold",
+                 "scanint_ms", "sweep_ms", "interval_ms", "t", "fresh")
+
+    def __init__(self, capacity=POOL_CHANNELS):
+        self.block = np.zeros((capacity, N_COLUMNS), dtype=np.int16)
+        self.n = -1
+        self.scanint_ms  = 0
+        self.sweep_ms    = 0
+        self.interval_ms = 0
+        self.t           = 0.0
+        self.fresh       = None             # slice of channels measured in this scan, None = all
+        self.resize(0)
+
+    @property
+    def capacity(self):
+        return self.block.shape[0]
+
+    @property
+    def data(self):
+        """(n, 5) view freq/avg/min/max/hold."""
+        return self.block[:self.n]
+
+    @property
+    def cols(self):
+        """(4, n) view avg/min/max/hold, e.g. as target for decoding."""
+        return self.block[:self.n, 1:].T
+
+    def resize(self, n: int):
+        """Sets number of channels; views are only rebuilt when n changes."""
+        if n == self.n:
+            return
+        if n > self.capacity:
+            self.block = np.zeros((max(n, 2 * self.capacity), N_COLUMNS), dtype=np.int16)
+        self.n = n
+        b = self.block[:n]
+        self.freqs = b[:, 0]
+        self.avg   = b[:, 1]
+        self.min   = b[:, 2]
+        self.max   = b[:, 3]
+        self.hold  = b[:, 4]
+        self.freq_hold = b[:, 0::4]         # (n, 2) freq/hold, e.g. for scatter offsets
+
+    def set_freq_ramp(self, f0: int, step: int):
+        """Equidistant frequencies f0 + i*step, always written in place (recycled frames may hold any freqs)."""
+        np.multiply(_ramp_index(self.n), step, out=self.freqs, casting="unsafe")
+        self.freqs += f0
+
+
+class FramePool:
+    """Thread-safe pool of ScanFrames (reader thread acquires, GUI releases)."""
+
+    def __init__(self, size=POOL_SIZE, capacity=POOL_CHANNELS):
+        self.size = size
+        self.capacity = capacity
+        self._free = deque(ScanFrame(capacity) for _ in range(size))
+        self._lock = threading.Lock()
+
+    def acquire(self, n: int) -> ScanFrame:
+        with self._lock:
+            frame = self._free.pop() if self._free else None
+        if frame is None:
+            frame = ScanFrame(max(n, self.capacity))
+        frame.resize(n)
+        frame.fresh = None
+        return frame
+
+    def release(self, frame: ScanFrame):
+        if frame is None:
+            return
+        with self._lock:
+            if len(self._free) < self.size:
+                self._free.append(frame)
@@ -0,0 +1,159 @@
+# helper lib for the adaptive sweep scheduler
+#
+# The device sweeps faster over a narrow span ('x <f1> <f2>') and with a
+# short scan interval ('!'). The scheduler watches the activity per channel
+# and alternates between
+#   full:  one sweep over the full range (normal interval), then decide
+#   dwell: DWELL_S seconds on the active sub-band at the fastest interval
+# All scans are merged into one full-range frame (channels outside the
+# current span keep their last values), so spectrum and waterfall see one
+# consistent frequency grid and timeline. frame.fresh marks the channels that
+# were really measured; detectors, tracker and capture only use those.
+
+import time
+
+import numpy as np
+
+DWELL_S        = 5.0        # seconds on the active sub-band between full sweeps
+ACT_LEVEL      = -75        # dBm (max), above = channel active
+ACT_ALPHA      = 0.3        # EMA factor of the activity per channel
+ACT_MIN        = 0.6        # min. activity of a channel for the dwell span (3 scans in a row)
+MARGIN_MHZ     = 3          # added left/right of the active channels
+MIN_SPAN_MHZ   = 10
+MAX_SPAN_FRAC  = 0.6        # dwell only if the span is at most this part of the full range
+DWELL_INTERVAL = "!"        # scan interval cmd while dwelling (0.25 s)
+FULL_INTERVAL  = "."        # scan interval cmd for full sweeps (0.5 s)
+RANGE_WAIT_S   = 3.0        # max. wait for the requested range after reset(f1, f2)
+
+
+class SweepScheduler:
+    """Sends x/interval commands depending on activity and merges the scans."""
+
+    def __init__(self, send, pool, dwell_s=DWELL_S, level=ACT_LEVEL):
+        self.send    = send                 # callback, e.g. send_command()
+        self.pool    = pool                 # FramePool for the merged frames
+        self.dwell_s = dwell_s
+        self.level   = level
+        self._reset()
+
+    def reset(self, f1=None, f2=None):
+        """
+        New full range after manual 'x'/'l'/'n'. With f1/f2 given, scans of
+        other ranges (still in flight) are dropped until the first scan of
+        exactly f1..f2 arrives; without, the next scan defines the range.
+        """
+        rng = (min(f1, f2), max(f1, f2)) if f1 is not None and f2 is not None else None
+        self._reset_req = (rng,)            # wird im Reader-Thread in feed() ausgeführt
+
+    def _reset(self, wait=None):
+        self._reset_req = None
+        self.wait   = wait                  # requested (f1, f2), other scans are dropped
+        self.t_wait = time.time()
+        self.f0     = None                  # full range f0 .. f0+n-1 (1 MHz grid)
+        self.n      = 0
+        self.canvas = None                  # (n, 5) int16, merged values
+        self.act    = None                  # activity per channel 0..1
+        self.state  = "full"
+        self.span   = None                  # expected (f1, f2) of incoming scans
+        self.t_dwell = 0.0
+
+    def _command(self, f1, f2, interval):
+        self.span = (f1, f2)
+        self.send(f"x {f1} {f2}\n")
+        self.send(interval)
+
+    def restore(self):
+        """Sends the full range and the normal interval (on exit, not left in a dwell)."""
+        if self._reset_req is None and self.f0 is not None and self.state == "dwell":
+            self._command(self.f0, self.f0 + self.n - 1, FULL_INTERVAL)
+            self.state = "full"
+
+    def _widen(self, f1, f2):
+        """Grows the full range to include f1..f2 (scan wider than the learned range)."""
+        lo, hi = min(f1, self.f0), max(f2, self.f0 + self.n - 1)
+        off = self.f0 - lo
+        canvas = np.zeros((hi - lo + 1, self.canvas.shape[1]), dtype=self.canvas.dtype)
+        canvas[:, 0] = np.arange(lo, hi + 1)
+        canvas[:, 1:] = self.canvas[:, 1:].min()
+        canvas[off:off + self.n] = self.canvas
+        act = np.zeros(hi - lo + 1, dtype=np.float32)
+        act[off:off + self.n] = self.act
+        self.f0, self.n, self.canvas, self.act = lo, hi - lo + 1, canvas, act
+
+    def _dwell_span(self):
+        """Sub-band around the active channels or None (no/too wide activity)."""
+        idx = np.flatnonzero(self.act >= ACT_MIN)
+        if idx.size == 0:
+            return None
+        lo = max(0, idx[0] - MARGIN_MHZ)
+        hi = min(self.n - 1, idx[-1] + MARGIN_MHZ)
+        if hi - lo + 1 < MIN_SPAN_MHZ:
+            c = (lo + hi) // 2
+            lo = max(0, min(c - MIN_SPAN_MHZ // 2, self.n - MIN_SPAN_MHZ))
+            hi = min(self.n - 1, lo + MIN_SPAN_MHZ - 1)
+        if hi - lo + 1 > MAX_SPAN_FRAC * self.n:
+            return None
+        return self.f0 + int(lo), self.f0 + int(hi)
+
+    def feed(self, frame):
+        """
+        Merges a scan into the full-range frame and advances the schedule.
+        Returns (merged frame, message or None). The incoming frame is given
+        back to the pool; scans not on the 1 MHz grid or of another range
+        while waiting for a requested range are dropped (None, None).
+        """
+        if self._reset_req is not None:
+            self._reset(*self._reset_req)
+        freqs = frame.freqs
+        f1, f2 = int(freqs[0]), int(freqs[-1])
+        if f2 - f1 + 1 != frame.n:
+            self.pool.release(frame)
+            return None, None
+        if self.wait is not None:
+            # Scans vom alten Bereich verwerfen, bis der angeforderte kommt
+            # (Timeout: z.B. vom Gerät abgelehnter Bereich)
+            if (f1, f2) != self.wait and time.time() - self.t_wait < RANGE_WAIT_S:
+                self.pool.release(frame)
+                return None, None
+            self.wait = None
+        if self.f0 is None:
+            self.f0, self.n = f1, frame.n
+            self.canvas = frame.data.copy()
+            self.act = np.zeros(self.n, dtype=np.float32)
+        elif f1 < self.f0 or f2 > self.f0 + self.n - 1:
+            self._widen(f1, f2)
+        off = f1 - self.f0
+
+        # einmischen und Aktivität (EMA) der gemessenen Kanäle nachführen
+        seg = slice(off, off + frame.n)
+        self.canvas[seg] = frame.data
+        a = self.act[seg]
+        a *= 1.0 - ACT_ALPHA
+        a += ACT_ALPHA * (frame.max > self.level)
+
+        merged = self.pool.acquire(self.n)
+        merged.block[:self.n] = self.canvas
+        merged.scanint_ms  = frame.scanint_ms
+        merged.sweep_ms    = frame.sweep_ms
+        merged.interval_ms = frame.interval_ms
+        merged.t           = frame.t
+        merged.fresh       = seg if frame.n != self.n else None
+        self.pool.release(frame)
+
+        # Zustandsautomat, Scans vom vorherigen Bereich (unterwegs) ignorieren
+        msg = None
+        if self.span is not None and (f1, f2) != self.span:
+            return merged, None
+        full = (f1, f2) == (self.f0, self.f0 + self.n - 1)
+        if self.state == "full" and full:
+            span = self._dwell_span()
+            if span is not None:
+                self.state = "dwell"
+                self.t_dwell = time.time()
+                self._command(span[0], span[1], DWELL_INTERVAL)
+                msg = f"adaptive: dwell {span[0]}...{span[1]} MHz"
+        elif self.state == "dwell" and time.time() - self.t_dwell >= self.dwell_s:
+            self.state = "full"
+            self._command(self.f0, self.f0 + self.n - 1, FULL_INTERVAL)
+            msg = "adaptive: full sweep"
+        return merged, msg
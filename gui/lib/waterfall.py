@@ -0,0 +1,114 @@
+# helper lib for a pre-colorized RGBA waterfall
+#
+# Instead of giving imshow() the whole float history (which matplotlib then
+# normalizes and colormaps completely on every frame), the waterfall keeps a
+# uint8 RGBA image. Only the newest row is mapped through a precomputed
+# colormap lookup table; the full image is recolored only when the dBm range
+# or the colormap changes.
+#
+# Both buffers are "double rings" of 2*rows rows: every row is written twice
+# (slot and slot+rows), so the chronological history is always a contiguous
+# view buf[pos+1 : pos+1+rows] and no rows have to be shifted.
+
+import numpy as np
+
+LUT_SIZE = 256
+
+# viridis at 0, 1/8, ..., 1 - fallback if matplotlib is not installed (e.g. export on a server)
+VIRIDIS_ANCHORS = np.array([
+    (0.267004, 0.004874, 0.329415), (0.282623, 0.140926, 0.457517),
+    (0.229739, 0.322361, 0.545706), (0.172719, 0.448791, 0.557885),
+    (0.127568, 0.566949, 0.550556), (0.157851, 0.683765, 0.501686),
+    (0.369214, 0.788888, 0.382914), (0.678489, 0.863742, 0.189503),
+    (0.993248, 0.906157, 0.143936),
+])
+
+
+def make_lut(cmap="viridis", n=LUT_SIZE) -> np.ndarray:
+    """RGBA lookup table (n x 4, uint8) of a matplotlib colormap (name or object)."""
+    if isinstance(cmap, str):
+        try:
+            import matplotlib
+        except ImportError:
+            if cmap != "viridis":
+                raise
+            x = np.linspace(0.0, 1.0, n)
+            xa = np.linspace(0.0, 1.0, len(VIRIDIS_ANCHORS))
+            lut = np.full((n, 4), 255, dtype=np.uint8)
+            for i in range(3):
+                lut[:, i] = np.round(255 * np.interp(x, xa, VIRIDIS_ANCHORS[:, i]))
+            return lut
+        cmap = matplotlib.colormaps[cmap]
+    return cmap(np.linspace(0.0, 1.0, n), bytes=True)
+
+def lut_index(vals, vmin, vmax, out=None, tmp=None, n=LUT_SIZE) -> np.ndarray:
+    """Maps dBm values to LUT indices 0..n-1 (like Normalize + Colormap, clipped)."""
+    scale = n / float(vmax - vmin) if vmax != vmin else 0.0
+    tmp = np.subtract(vals, vmin, out=tmp, dtype=np.float32)
+    np.multiply(tmp, scale, out=tmp)
+    np.clip(tmp, 0, n - 1, out=tmp)
+    if out is None:
+        return tmp.astype(np.uint8)
+    np.copyto(out, tmp, casting="unsafe")
+    return out
+
+
+class RgbaWaterfall:
+    """Waterfall history (rows x channels) as raw dBm values and as RGBA image."""
+
+    def __init__(self, rows: int, channels: int, vmin, vmax, cmap="viridis", fill=None):
+        self.rows     = rows
+        self.channels = channels
+        self.vmin     = vmin
+        self.vmax     = vmax
+        self.cmap     = cmap
+        self.lut      = make_lut(cmap)
+        self._raw  = np.full((2 * rows, channels), vmin if fill is None else fill, dtype=np.float32)
+        self._rgba = np.empty((2 * rows, channels, 4), dtype=np.uint8)
+        self._pos  = rows - 1               # slot of the newest row
+        # Arbeitspuffer für eine Zeile
+        self._tmp = np.empty(channels, dtype=np.float32)
+        self._idx = np.empty(channels, dtype=np.uint8)
+        self.recolor()
+
+    @property
+    def image(self) -> np.ndarray:
+        """RGBA view (rows x channels x 4), oldest row first, newest last."""
+        p = self._pos + 1
+        return self._rgba[p:p + self.rows]
+
+    @property
+    def values(self) -> np.ndarray:
+        """dBm view (rows x channels), oldest row first, newest last."""
+        p = self._pos + 1
+        return self._raw[p:p + self.rows]
+
+    def push(self, values: np.ndarray):
+        """Adds a new row; only this row is colormapped."""
+        pos = (self._pos + 1) % self.rows
+        raw = self._raw[pos]
+        raw[:] = values
+        self._raw[pos + self.rows] = raw
+        lut_index(raw, self.vmin, self.vmax, out=self._idx, tmp=self._tmp)
+        np.take(self.lut, self._idx, axis=0, out=self._rgba[pos])
+        self._rgba[pos + self.rows] = self._rgba[pos]
+        self._pos = pos
+
+    def recolor(self):
+        """Colormaps the complete history (after a change of range or colormap)."""
+        idx = lut_index(self._raw, self.vmin, self.vmax)
+        np.take(self.lut, idx, axis=0, out=self._rgba)
+
+    def set_clim(self, vmin, vmax):
+        if vmin == self.vmin and vmax == self.vmax:
+            return
+        self.vmin = vmin
+        self.vmax = vmax
+        self.recolor()
+
+    def set_cmap(self, cmap):
+        if cmap == self.cmap:
+            return
+        self.cmap = cmap
+        self.lut = make_lut(cmap)
+        self.recolor()